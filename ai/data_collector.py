@@ -1,10 +1,39 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
 import pandas as pd
 import kookpy
-from datetime import datetime, timedelta
-import os
+from ai.history_store import HistoryStore, month_range, spot_slug
+
+# days requested per api call. open-meteo happily serves a month of hourly data
+# in one response, so this turns ~730 calls per year into ~24
+DEFAULT_WINDOW_DAYS = 31
+
+DEFAULT_OUTPUT_PATH = os.path.join('ai', 'historical_surf_data.csv')
+
+# bulk multi-spot collection: spot/month units run in parallel, but every upstream
+# request shares one token bucket so the whole job stays under the open-meteo rate limit
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 5.0
+MANIFEST_FILE = 'manifest.json'
 
 
-def collect_and_save_historical_data(location_name, start_date_str, end_date_str):
+def date_windows(start_date, end_date, window_days=DEFAULT_WINDOW_DAYS):
+    # splits [start_date, end_date] (inclusive) into consecutive windows of at most window_days
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        yield window_start, window_end
+        window_start = window_end + timedelta(days=1)
+
+
+def collect_and_save_historical_data(location_name, start_date_str, end_date_str,
+                                     window_days=DEFAULT_WINDOW_DAYS, output_path=DEFAULT_OUTPUT_PATH):
     # collects historical surf data, calculates a quality score, and saves it to csv.
 
     # gecodoe location analysis
@@ -16,59 +45,260 @@ def collect_and_save_historical_data(location_name, start_date_str, end_date_str
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
 
-    all_data = []
-
-    current_date = start_date
-    while current_date <= end_date:
-        current_date_str = current_date.strftime('%Y-%m-%d')
-        print(f"fetching data for {current_date_str}...")
+    frames = []
+    for window_start, window_end in date_windows(start_date, end_date, window_days):
+        window_start_str = window_start.strftime('%Y-%m-%d')
+        window_end_str = window_end.strftime('%Y-%m-%d')
+        print(f"fetching data for {window_start_str} to {window_end_str}...")
 
         try:
-            # use new api classes for polymorphism demo
-            marine_api = kookpy.OpenMeteoMarineAPI(coords['latitude'], coords['longitude'], current_date_str, current_date_str)
-            wind_api = kookpy.OpenMeteoWindAPI(coords['latitude'], coords['longitude'], current_date_str, current_date_str)
-
-            marine_data = marine_api.fetch_data()
-            wind_data = wind_api.fetch_data()
-
-            # check empty and merge
-            if not marine_data.empty and not wind_data.empty:
-                combined_df = pd.merge(
-                    marine_data, wind_data, on='time', how='inner')
-
-                combined_df['wave_quality_score'] = combined_df.apply(
-                    kookpy.calculate_heuristic_score, axis=1)
-                # ------------------------------------
-
-                all_data.append(combined_df)
-            else:
-                print(
-                    f"could not fetch data for {current_date_str}. skipping.")
+            window_df = fetch_window(coords, window_start_str, window_end_str)
         except Exception as e:
-            print(f"error fetching data for {current_date_str}: {e}")
-
-        current_date += timedelta(days=1)
-
-    if all_data:
-        full_df = pd.concat(all_data, ignore_index=True)
-        # drop missing rows
-        full_df.dropna(inplace=True)
-
-        if not full_df.empty:
-            # save data to a predictable location, relative to the project root
-            file_path = os.path.join('ai', 'historical_surf_data.csv')
-            full_df.to_csv(file_path, index=False)
-            print(
-                f"\nsuccessfully collected and saved {len(full_df)} data points to {file_path}")
-        else:
-            print("\nno data was collected.")
-    else:
+            print(f"error fetching data for {window_start_str} to {window_end_str}: {e}")
+            continue
+        if window_df.empty:
+            print(f"could not fetch data for {window_start_str} to {window_end_str}. skipping.")
+            continue
+        frames.append(window_df)
+
+    if not frames:
         print("\nno data was collected.")
+        return None
+
+    full_df = pd.concat(frames, ignore_index=True)
+    # save data to a predictable location, relative to the project root
+    full_df.to_csv(output_path, index=False)
+    print(f"\nsuccessfully collected and saved {len(full_df)} data points to {output_path}")
+    return full_df
+
+
+def fetch_window(coords, window_start_str, window_end_str):
+    # marine + wind for one date window (fetched concurrently), merged, cleaned and scored.
+    # empty frame if either call fails. every collection path goes through here
+    marine_data, wind_data = kookpy.fetch_marine_and_wind(
+        coords['latitude'], coords['longitude'], window_start_str, window_end_str)
+    if marine_data.empty or wind_data.empty:
+        return pd.DataFrame()
+
+    combined_df = pd.merge(marine_data, wind_data, on='time', how='inner').dropna()
+    combined_df['wave_quality_score'] = kookpy.calculate_heuristic_score_vectorized(combined_df)
+    return combined_df
+
+
+def month_window(month, start_date, end_date):
+    # the part of [start_date, end_date] inside one yyyy-mm, as date strings
+    month_start = datetime.strptime(month, '%Y-%m')
+    month_end = (pd.Timestamp(month_start) + pd.offsets.MonthEnd(0)).to_pydatetime()
+    return max(start_date, month_start).strftime('%Y-%m-%d'), min(end_date, month_end).strftime('%Y-%m-%d')
+
+
+def collect_into_store(location_name, start_date_str, end_date_str, store=None):
+    # incremental collection into the partitioned history store.
+    # only months that are missing (or don't cover the requested days yet) are fetched.
+    # returns the months written
+    store = store or HistoryStore()
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+
+    missing = store.missing_months(location_name, start_date, end_date)
+    if not missing:
+        print(f"history for {location_name} is already up to date.")
+        return []
+
+    coords = kookpy.geocode_location(location_name)
+    if not coords:
+        print(f"error: could not find coordinates for {location_name}.")
+        return []
+
+    written = []
+    for month in missing:
+        window_start_str, window_end_str = month_window(month, start_date, end_date)
+        print(f"fetching data for {location_name} {window_start_str} to {window_end_str}...")
+
+        try:
+            month_df = fetch_window(coords, window_start_str, window_end_str)
+        except Exception as e:
+            print(f"error fetching data for {window_start_str} to {window_end_str}: {e}")
+            continue
+        if month_df.empty:
+            print(f"could not fetch data for {window_start_str} to {window_end_str}. skipping.")
+            continue
+        written.extend(store.append(location_name, month_df))
+
+    print(f"\nwrote {len(written)} month partitions for {location_name} to {store.root}")
+    return written
+
+
+class CollectionManifest:
+    # json record of a bulk collection job: its parameters plus every (spot, month) unit
+    # that finished and the days it covered. an interrupted run skips those units without
+    # opening their partitions, and picks up where it stopped.
+    # rewritten atomically after each unit
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._data = {'job': {}, 'completed': {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._data = json.load(f)
+            self._data.setdefault('job', {})
+            self._data.setdefault('completed', {})
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def job(self):
+        return dict(self._data['job'])
+
+    @staticmethod
+    def unit_key(spot, month):
+        return f"{spot_slug(spot)}/{month}"
+
+    def set_job(self, **job):
+        with self._lock:
+            self._data['job'] = job
+            self._save()
+
+    def is_done(self, spot, month, window_start=None, window_end=None):
+        # true if the unit finished, and when a window (yyyy-mm-dd strings) is given, if the
+        # days collected then cover it
+        with self._lock:
+            unit = self._data['completed'].get(self.unit_key(spot, month))
+        if unit is None:
+            return False
+        if window_start is None and window_end is None:
+            return True
+        return 'start' in unit and unit['start'] <= window_start and unit['end'] >= window_end
+
+    def mark_done(self, spot, month, rows, window_start=None, window_end=None):
+        with self._lock:
+            unit = {'rows': int(rows), 'completed_at': datetime.now().isoformat(timespec='seconds')}
+            if window_start is not None:
+                unit.update(start=window_start, end=window_end)
+            self._data['completed'][self.unit_key(spot, month)] = unit
+            self._save()
+
+    def completed(self):
+        with self._lock:
+            return dict(self._data['completed'])
+
+    def _save(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+
+def collect_unit(spot, coords, month, start_date, end_date, store):
+    # fetches one spot/month into the store. returns the rows written (0 if the fetch failed)
+    window_start_str, window_end_str = month_window(month, start_date, end_date)
+    month_df = fetch_window(coords, window_start_str, window_end_str)
+    if month_df.empty:
+        return 0
+    store.append(spot, month_df)
+    return len(month_df)
+
+
+def collect_spots(spots, start_date_str, end_date_str, store=None, workers=DEFAULT_WORKERS,
+                  rate_limit=DEFAULT_RATE_LIMIT, manifest=None):
+    # parallel collection of many spots into the history store, one unit per spot/month.
+    # units the manifest records as done are skipped outright; the rest are checked against the
+    # store (e.g. months seeded from the legacy csv), so rerunning an interrupted job only fetches what's left.
+    # returns {'completed', 'skipped', 'failed'} unit counts
+    store = store or HistoryStore()
+    manifest = manifest or CollectionManifest(os.path.join(store.root, MANIFEST_FILE))
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+    manifest.set_job(spots=list(spots), start=start_date_str, end=end_date_str)
+
+    if rate_limit:
+        # one token per upstream request across every worker
+        kookpy.BaseWeatherAPI.configure_session(rate_limit=rate_limit, max_concurrency=2 * workers)
+
+    summary = {'completed': 0, 'skipped': 0, 'failed': 0}
+    units = []
+    months = month_range(start_date, end_date)
+    for spot in spots:
+        # only units the manifest doesn't know about cost a partition read
+        pending = [month for month in months
+                   if not manifest.is_done(spot, month, *month_window(month, start_date, end_date))
+                   and store.missing_months(spot, *month_window(month, start_date, end_date))]
+        summary['skipped'] += len(months) - len(pending)
+        if not pending:
+            continue
+        coords = kookpy.geocode_location(spot)
+        if not coords:
+            print(f"error: could not find coordinates for {spot}.")
+            summary['failed'] += len(pending)
+            continue
+        units.extend((spot, coords, month) for month in pending)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kookpy-collector') as pool:
+        futures = {pool.submit(collect_unit, spot, coords, month, start_date, end_date, store): (spot, month)
+                   for spot, coords, month in units}
+        for future in as_completed(futures):
+            spot, month = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"error fetching data for {spot} {month}: {e}")
+                summary['failed'] += 1
+                continue
+            if not rows:
+                # left out of the manifest so the next run retries it
+                print(f"could not fetch data for {spot} {month}. will retry on the next run.")
+                summary['failed'] += 1
+                continue
+            manifest.mark_done(spot, month, rows, *month_window(month, start_date, end_date))
+            summary['completed'] += 1
+            print(f"collected {rows} rows for {spot} {month} "
+                  f"({summary['completed'] + summary['failed']}/{len(units)})")
+
+    print(f"\ncompleted {summary['completed']} units, skipped {summary['skipped']}, "
+          f"failed {summary['failed']} in {time.perf_counter() - started:.1f}s")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="collect historical surf data into the partitioned history store")
+    parser.add_argument('--spots', nargs='*', default=None, help="spots to collect (default: laguna beach)")
+    parser.add_argument('--start', default=None, help="first day, yyyy-mm-dd")
+    parser.add_argument('--end', default=None, help="last day, yyyy-mm-dd")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="spot/months fetched in parallel")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_LIMIT,
+                        help="max upstream requests per second across all workers (0 = unlimited)")
+    parser.add_argument('--store', default=None, help="history store root (default: ai/history)")
+    parser.add_argument('--resume', action='store_true',
+                        help="rerun the job recorded in the store's manifest")
+    args = parser.parse_args(argv)
+
+    # months already live in the history store, keeping them in the app's response cache too
+    # would only push forecasts out of it. the manifest and the store make reruns cheap instead
+    kookpy.BaseWeatherAPI.configure_cache(enabled=False)
+
+    store = HistoryStore(args.store) if args.store else HistoryStore()
+    manifest = CollectionManifest(os.path.join(store.root, MANIFEST_FILE))
+    job = manifest.job if args.resume else {}
+    if args.resume and not job:
+        print(f"no job recorded in {manifest.path}, nothing to resume.")
+        return None
+
+    spots = args.spots or job.get('spots') or ["laguna beach"]
+    start = args.start or job.get('start') or "2023-01-01"
+    end = args.end or job.get('end') or "2024-01-01"
+
+    legacy_spot = "laguna beach"
+    if legacy_spot in spots and not store.months(legacy_spot) and os.path.exists(DEFAULT_OUTPUT_PATH):
+        # seed the store from the legacy csv so those months aren't fetched again
+        store.import_csv(DEFAULT_OUTPUT_PATH, legacy_spot)
+    return collect_spots(spots, start, end, store, args.workers, args.rate, manifest)
 
 
 if __name__ == '__main__':
-    # run data collection for a year
-    location = "laguna beach"
-    start = "2023-01-01"
-    end = "2024-01-01"
-    collect_and_save_historical_data(location, start, end)
\ No newline at end of file
+    main()
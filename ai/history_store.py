@@ -0,0 +1,144 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# partitioned columnar store for the historical training data:
+#   ai/history/spot=<spot>/month=<yyyy-mm>/data.feather
+# files are uncompressed arrow ipc so reads can be memory-mapped
+HISTORY_STORE_ROOT = os.path.join('ai', 'history')
+
+FLOAT_COLUMNS = ['swell_wave_height', 'swell_wave_period', 'wave_direction', 'sea_level_height_msl',
+                 'wind_speed_10m', 'wind_direction_10m', 'wave_quality_score']
+
+_PARTITION_FILE = 'data.feather'
+
+
+def spot_slug(spot):
+    # "Main Beach, Laguna" -> "main_beach_laguna"
+    return re.sub(r'[^a-z0-9]+', '_', str(spot).lower()).strip('_')
+
+
+def month_range(start_date, end_date):
+    # every yyyy-mm overlapping [start_date, end_date]
+    return [period.strftime('%Y-%m') for period in pd.period_range(start_date, end_date, freq='M')]
+
+
+class HistoryStore:
+    # spot/month partitioned feather files with typed float32 columns
+    def __init__(self, root=HISTORY_STORE_ROOT):
+        self._root = root
+
+    @property
+    def root(self):
+        return self._root
+
+    def partition_path(self, spot, month):
+        return os.path.join(self._root, f"spot={spot_slug(spot)}", f"month={month}", _PARTITION_FILE)
+
+    def has_partition(self, spot, month):
+        return os.path.exists(self.partition_path(spot, month))
+
+    def spots(self):
+        if not os.path.isdir(self._root):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(self._root) if name.startswith('spot='))
+
+    def months(self, spot):
+        spot_dir = os.path.join(self._root, f"spot={spot_slug(spot)}")
+        if not os.path.isdir(spot_dir):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(spot_dir)
+                      if name.startswith('month=') and os.path.exists(os.path.join(spot_dir, name, _PARTITION_FILE)))
+
+    def partitions(self, spots=None, months=None):
+        # (spot, month, path) for every stored partition, optionally filtered
+        result = []
+        wanted_spots = None if spots is None else {spot_slug(spot) for spot in spots}
+        for spot in self.spots():
+            if wanted_spots is not None and spot not in wanted_spots:
+                continue
+            for month in self.months(spot):
+                if months is None or month in months:
+                    result.append((spot, month, self.partition_path(spot, month)))
+        return result
+
+    def missing_months(self, spot, start_date, end_date):
+        # months in the range whose partition is absent or doesn't cover the requested days
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        missing = []
+        for month in month_range(start, end):
+            if not self.has_partition(spot, month):
+                missing.append(month)
+                continue
+            month_start = max(start, pd.Timestamp(f"{month}-01"))
+            month_end = min(end, pd.Timestamp(f"{month}-01") + pd.offsets.MonthEnd(0))
+            times = self._read_table(self.partition_path(spot, month), ['time']).column('time').to_pandas()
+            if times.empty or times.min().normalize() > month_start or times.max().normalize() < month_end:
+                missing.append(month)
+        return missing
+
+    @staticmethod
+    def _typed(df):
+        df = df.copy()
+        df['time'] = pd.to_datetime(df['time'])
+        for column in FLOAT_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype(np.float32)
+        return df.sort_values('time').reset_index(drop=True)
+
+    def write_partition(self, spot, month, df):
+        # writes one month atomically (temp file + rename) so readers never see half a file
+        path = self.partition_path(spot, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        table = pa.Table.from_pandas(self._typed(df), preserve_index=False)
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+
+    def append(self, spot, df):
+        # splits a frame by month and merges it into the matching partitions (newer rows win).
+        # returns the months written
+        if df.empty:
+            return []
+        df = self._typed(df)
+        written = []
+        for month, month_df in df.groupby(df['time'].dt.strftime('%Y-%m')):
+            if self.has_partition(spot, month):
+                existing = self._read_table(self.partition_path(spot, month)).to_pandas()
+                month_df = pd.concat([existing, month_df], ignore_index=True)
+                month_df = month_df.drop_duplicates(subset='time', keep='last')
+            self.write_partition(spot, month, month_df)
+            written.append(month)
+        return written
+
+    @staticmethod
+    def _read_table(path, columns=None):
+        return feather.read_table(path, columns=columns, memory_map=True)
+
+    def read(self, columns=None, spots=None, months=None, add_spot=False):
+        # reads just the requested columns from the matching partitions into one frame
+        tables = []
+        for spot, month, path in self.partitions(spots, months):
+            table = self._read_table(path, columns)
+            if add_spot:
+                table = table.append_column('spot', pa.array([spot] * table.num_rows, pa.string()))
+            tables.append(table)
+        if not tables:
+            return pd.DataFrame(columns=columns or [])
+        return pa.concat_tables(tables).to_pandas()
+
+    def iter_batches(self, partitions=None, columns=None, chunk_rows=8192):
+        # streams frames of at most chunk_rows from the given (spot, month, path) partitions,
+        # so callers never hold more than one chunk of a memory-mapped file
+        for _, _, path in (self.partitions() if partitions is None else partitions):
+            for batch in self._read_table(path, columns).to_batches(max_chunksize=chunk_rows):
+                yield batch.to_pandas()
+
+    def import_csv(self, csv_path, spot):
+        # one-off migration of a legacy historical_surf_data.csv into the store
+        return self.append(spot, pd.read_csv(csv_path, parse_dates=['time']))
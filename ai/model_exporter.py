@@ -0,0 +1,48 @@
+import numpy as np
+import joblib
+import os
+
+
+def export_numpy_model(model, scaler_x, scaler_y, path=os.path.join('ai', 'wave_prediction_model.npz')):
+    # writes the dense layer weights and both scalers into one compact .npz file
+    # so the app can run the model with plain numpy (see kookpy.NumpyWaveModel)
+    arrays = {
+        'x_mean': np.asarray(scaler_x.mean_, dtype=np.float64),
+        'x_scale': np.asarray(scaler_x.scale_, dtype=np.float64),
+        'y_mean': np.asarray(scaler_y.mean_, dtype=np.float64),
+        'y_scale': np.asarray(scaler_y.scale_, dtype=np.float64),
+    }
+    if hasattr(scaler_x, 'feature_names_in_'):
+        arrays['feature_names'] = np.asarray(scaler_x.feature_names_in_, dtype=str)
+
+    activations = []
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if not weights:
+            # skip layers without weights (input/dropout etc.)
+            continue
+        kernel, bias = weights
+        arrays[f'kernel_{len(activations)}'] = kernel.astype(np.float32)
+        arrays[f'bias_{len(activations)}'] = bias.astype(np.float32)
+        activations.append(layer.get_config().get('activation', 'linear'))
+    arrays['activations'] = np.asarray(activations, dtype=str)
+
+    np.savez_compressed(path, **arrays)
+    print(f"numpy model exported to {path}")
+    return path
+
+
+if __name__ == '__main__':
+    # export the already trained model without retraining it.
+    # tensorflow is only needed here, not in the app
+    from tensorflow import keras
+
+    model_path = os.path.join('ai', 'wave_prediction_model.keras')
+    scaler_x_path = os.path.join('ai', 'scaler_X.pkl')
+    scaler_y_path = os.path.join('ai', 'scaler_y.pkl')
+
+    if not all(os.path.exists(p) for p in [model_path, scaler_x_path, scaler_y_path]):
+        print("error: model or scaler files not found. please run 'model_trainer.py' first.")
+    else:
+        model = keras.models.load_model(model_path, compile=False)
+        export_numpy_model(model, joblib.load(scaler_x_path), joblib.load(scaler_y_path))
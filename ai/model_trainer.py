@@ -1,3 +1,10 @@
+import argparse
+import json
+import resource
+import sys
+import time
+
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -6,21 +13,67 @@ from tensorflow import keras
 import joblib
 import os
 import kookpy
+from kookpy.registry import ModelRegistry
+from ai.model_exporter import export_numpy_model
+from ai.history_store import HistoryStore
+
+FEATURES = ['swell_wave_height', 'swell_wave_period',
+            'wind_speed_10m', 'sea_level_height_msl']
+TARGET = 'wave_quality_score'
+CSV_PATH = os.path.join('ai', 'historical_surf_data.csv')
+
+# held-out fraction. the streaming split is decided per row from a hash of its timestamp,
+# so it is stable across runs without ever holding the whole dataset
+TEST_SIZE = 0.2
+
+# streaming mode: rows read from a partition at a time, and rows held in the shuffle buffer
+STREAM_CHUNK_ROWS = 8192
+SHUFFLE_BUFFER = 10000
+BATCH_SIZE = 32
+
+# warm start: fine-tune the current model on partitions added since the last promoted
+# training run, plus this fraction of the older rows so it doesn't forget them
+MODEL_DIR = 'ai'
+TRAINING_STATE_FILE = 'training_state.json'
+WARM_START_EPOCHS = 20
+WARM_START_LEARNING_RATE = 1e-4
+REPLAY_FRACTION = 0.1
+EARLY_STOPPING_PATIENCE = 3
+
+
+def load_training_data(store=None, csv_path=CSV_PATH, columns=FEATURES + [TARGET]):
+    # reads only the feature/target columns. prefers the partitioned history store
+    # (memory-mapped feather) and falls back to the legacy csv when the store is empty
+    store = store or HistoryStore()
+    if store.partitions():
+        print(f"loading training data from {store.root}...")
+        df = store.read(columns=columns)
+    elif os.path.exists(csv_path):
+        print(f"loading training data from {csv_path}...")
+        df = pd.read_csv(csv_path, usecols=lambda column: column in columns)
+    else:
+        return None
+    return df.dropna()
 
-def build_and_train_model(x_train, y_train, epochs=100):
-    # bread and butter of creating the actual model
 
+def build_model(n_features):
+    # bread and butter of creating the actual model
     model = keras.Sequential([
         keras.layers.Dense(64, activation='relu',
-                           input_shape=(x_train.shape[1],)),
+                           input_shape=(n_features,)),
         keras.layers.Dense(32, activation='relu'),
         keras.layers.Dense(1)
     ])
 
     model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+
+def build_and_train_model(x_train, y_train, epochs=100):
+    model = build_model(x_train.shape[1])
 
     print("starting model training...")
-    model.fit(x_train, y_train, epochs=epochs, batch_size=32, verbose=1)
+    model.fit(x_train, y_train, epochs=epochs, batch_size=BATCH_SIZE, verbose=1)
     print("model training complete.")
     return model
 
@@ -28,59 +81,349 @@ def build_and_train_model(x_train, y_train, epochs=100):
 def save_model_and_scalers(model, scaler_x, scaler_y,
                            model_path='wave_prediction_model.keras',
                            scaler_x_path='scaler_X.pkl',
-                           scaler_y_path='scaler_y.pkl'):
+                           scaler_y_path='scaler_y.pkl',
+                           base_dir=MODEL_DIR, metrics=None):
     # save the model and scalers to the ai/ directory relative to the project root
-    base_dir = 'ai'
+    numpy_model_path = os.path.splitext(model_path)[0] + '.npz'
     model.save(os.path.join(base_dir, model_path))
     joblib.dump(scaler_x, os.path.join(base_dir, scaler_x_path))
     joblib.dump(scaler_y, os.path.join(base_dir, scaler_y_path))
+    # compact numpy copy of the model used by the app at serve time
+    export_numpy_model(model, scaler_x, scaler_y, os.path.join(base_dir, numpy_model_path))
     print("\nmodel and scalers saved successfully.")
 
+    # publish the matching set as a new registry version, the running app swaps it in
+    registry = ModelRegistry(os.path.join(base_dir, 'models'))
+    return registry.publish({name: os.path.join(base_dir, name)
+                             for name in (model_path, scaler_x_path, scaler_y_path, numpy_model_path)},
+                            metrics=metrics)
+
+
+def peak_rss_mb():
+    # peak resident set size of this process so far (ru_maxrss is kb on linux, bytes on macos)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def holdout_mask(times, test_size=TEST_SIZE):
+    # true for rows in the held-out split, chosen by hashing the timestamp
+    hashed = pd.util.hash_pandas_object(pd.Series(times), index=False).to_numpy()
+    return hashed % 10000 < int(test_size * 10000)
+
+
+def iter_chunks(store, partitions, holdout, test_size=TEST_SIZE, chunk_rows=STREAM_CHUNK_ROWS):
+    # yields (x, y) float32 arrays of at most chunk_rows, one partition at a time.
+    # holdout picks the held-out rows (True) or the training rows (False)
+    for df in store.iter_batches(partitions, ['time'] + FEATURES + [TARGET], chunk_rows):
+        df = df.dropna()
+        df = df[holdout_mask(df['time'], test_size) == holdout]
+        if df.empty:
+            continue
+        yield (df[FEATURES].to_numpy(dtype=np.float32),
+               df[[TARGET]].to_numpy(dtype=np.float32))
+
+
+def fit_scalers_streaming(store, partitions, test_size=TEST_SIZE, chunk_rows=STREAM_CHUNK_ROWS):
+    # one pass over the training rows, fitting both scalers incrementally
+    scaler_x = StandardScaler()
+    scaler_y = StandardScaler()
+    for x_chunk, y_chunk in iter_chunks(store, partitions, False, test_size, chunk_rows):
+        scaler_x.partial_fit(x_chunk)
+        scaler_y.partial_fit(y_chunk)
+    if not hasattr(scaler_x, 'mean_'):
+        return None, None
+    return scaler_x, scaler_y
+
+
+def make_dataset(store, partitions, scaler_x, scaler_y, holdout=False, test_size=TEST_SIZE,
+                 batch_size=BATCH_SIZE, shuffle_buffer=SHUFFLE_BUFFER, chunk_rows=STREAM_CHUNK_ROWS, seed=42):
+    # tf.data pipeline that re-reads the partitions every epoch. training data is shuffled
+    # across partitions (order) and rows (bounded buffer), and batches are prefetched
+    # while the previous step runs
+    rng = np.random.default_rng(seed)
+
+    def generate():
+        order = list(partitions)
+        if not holdout:
+            rng.shuffle(order)
+        for x_chunk, y_chunk in iter_chunks(store, order, holdout, test_size, chunk_rows):
+            yield (scaler_x.transform(x_chunk).astype(np.float32),
+                   scaler_y.transform(y_chunk).astype(np.float32))
+
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=(
+        tf.TensorSpec(shape=(None, len(FEATURES)), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, 1), dtype=tf.float32),
+    )).unbatch()
+    if not holdout:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def evaluate_streaming(model, scaler_x, scaler_y, store, partitions, test_size=TEST_SIZE,
+                       chunk_rows=STREAM_CHUNK_ROWS):
+    # mse in score units over the held-out rows, accumulated chunk by chunk
+    squared_error = 0.0
+    rows = 0
+    for x_chunk, y_chunk in iter_chunks(store, partitions, True, test_size, chunk_rows):
+        predicted = scaler_y.inverse_transform(model.predict_on_batch(scaler_x.transform(x_chunk)))
+        squared_error += float(np.sum((predicted - y_chunk) ** 2))
+        rows += len(y_chunk)
+    return squared_error / rows if rows else float('nan')
+
+
+def train_streaming(store=None, epochs=100, batch_size=BATCH_SIZE, shuffle_buffer=SHUFFLE_BUFFER,
+                    test_size=TEST_SIZE, chunk_rows=STREAM_CHUNK_ROWS):
+    # out-of-core training straight from the history store. memory stays bounded by the
+    # shuffle buffer and one chunk, however many partitions there are.
+    # returns (model, scaler_x, scaler_y, metrics) or None when there is no data
+    store = store or HistoryStore()
+    partitions = store.partitions()
+    if not partitions:
+        return None
+
+    started = time.perf_counter()
+    print(f"fitting scalers over {len(partitions)} partitions...")
+    scaler_x, scaler_y = fit_scalers_streaming(store, partitions, test_size, chunk_rows)
+    if scaler_x is None:
+        return None
+
+    train_rows = int(np.max(scaler_x.n_samples_seen_))
+    # the stream has no known length, so repeat it and tell keras where an epoch ends
+    train_ds = make_dataset(store, partitions, scaler_x, scaler_y, False, test_size,
+                            batch_size, shuffle_buffer, chunk_rows).repeat()
+    val_rows = sum(len(y_chunk) for _, y_chunk in iter_chunks(store, partitions, True, test_size, chunk_rows))
+    val_ds = make_dataset(store, partitions, scaler_x, scaler_y, True, test_size,
+                          batch_size, shuffle_buffer, chunk_rows)
+    val_ds = val_ds.apply(tf.data.experimental.assert_cardinality(int(np.ceil(val_rows / batch_size))))
+
+    model = build_model(len(FEATURES))
+    print("starting streaming model training...")
+    model.fit(train_ds, validation_data=val_ds, epochs=epochs,
+              steps_per_epoch=int(np.ceil(train_rows / batch_size)), verbose=1)
+    print("model training complete.")
+
+    metrics = {
+        'mode': 'streaming',
+        'train_rows': train_rows,
+        'val_mse': evaluate_streaming(model, scaler_x, scaler_y, store, partitions, test_size, chunk_rows),
+        'train_time_s': time.perf_counter() - started,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    return model, scaler_x, scaler_y, metrics
 
-if __name__ == '__main__':
 
-    # file path relative to the project root
-    file_path = os.path.join('ai', 'historical_surf_data.csv')
+def train_in_memory(df, epochs=100, test_size=TEST_SIZE):
+    # the original path: whole frame in memory, random split, scalers fit in one go
+    started = time.perf_counter()
+    x_train, x_test, y_train, y_test = train_test_split(
+        df[FEATURES], df[TARGET], test_size=test_size, random_state=42)
 
-    if not os.path.exists(file_path):
-        print(f"error: data file not found at '{file_path}'.")
-        print("please run 'data_collector.py' first to generate the historical data.")
+    # scale the features and target data
+    scaler_x = StandardScaler()
+    x_train_scaled = scaler_x.fit_transform(x_train)
+
+    scaler_y = StandardScaler()
+    y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1, 1))
+
+    model = build_and_train_model(x_train_scaled, y_train_scaled, epochs)
+
+    predicted = scaler_y.inverse_transform(model.predict(scaler_x.transform(x_test), verbose=0))[:, 0]
+    metrics = {
+        'mode': 'in-memory',
+        'train_rows': len(x_train),
+        'val_mse': float(np.mean((predicted - y_test.to_numpy()) ** 2)),
+        'train_time_s': time.perf_counter() - started,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    return model, scaler_x, scaler_y, metrics
+
+
+def partition_versions(store):
+    # {"spot/month": mtime} for every partition, used to spot what changed since a training run
+    return {f"{spot}/{month}": os.path.getmtime(path) for spot, month, path in store.partitions()}
+
+
+def load_training_state(base_dir=MODEL_DIR):
+    path = os.path.join(base_dir, TRAINING_STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_training_state(store, metrics, base_dir=MODEL_DIR):
+    # records which partitions (and versions) the saved model was trained on
+    state = {'partitions': partition_versions(store), 'mode': metrics['mode'], 'val_mse': metrics['val_mse'],
+             'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    path = os.path.join(base_dir, TRAINING_STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def new_partitions(store, state):
+    # partitions added or rewritten since the state was recorded (all of them without a state)
+    trained = (state or {}).get('partitions', {})
+    return [(spot, month, path) for spot, month, path in store.partitions()
+            if trained.get(f"{spot}/{month}") != os.path.getmtime(path)]
+
+
+def load_fine_tune_data(store, fresh, replay_fraction=REPLAY_FRACTION, chunk_rows=STREAM_CHUNK_ROWS, seed=42):
+    # every row of the new partitions plus a random replay sample of the older ones
+    columns = ['time'] + FEATURES + [TARGET]
+    fresh_keys = {(spot, month) for spot, month, _ in fresh}
+    older = [partition for partition in store.partitions() if partition[:2] not in fresh_keys]
+    rng = np.random.default_rng(seed)
+
+    frames = list(store.iter_batches(fresh, columns, chunk_rows))
+    if replay_fraction > 0:
+        for chunk in store.iter_batches(older, columns, chunk_rows):
+            frames.append(chunk[rng.random(len(chunk)) < replay_fraction])
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True).dropna()
+
+
+def scale_features(scaler_x, x):
+    # in-memory scalers are fitted on a frame and streaming ones on arrays, match what it saw
+    if hasattr(scaler_x, 'feature_names_in_'):
+        x = pd.DataFrame(x, columns=scaler_x.feature_names_in_)
+    return scaler_x.transform(x)
+
+
+def mse_in_score_units(model, scaler_x, scaler_y, x, y):
+    predicted = scaler_y.inverse_transform(model.predict_on_batch(scale_features(scaler_x, x)))[:, 0]
+    return float(np.mean((predicted - y) ** 2))
+
+
+def warm_start(store=None, base_dir=MODEL_DIR, epochs=WARM_START_EPOCHS, batch_size=BATCH_SIZE,
+               replay_fraction=REPLAY_FRACTION, patience=EARLY_STOPPING_PATIENCE,
+               learning_rate=WARM_START_LEARNING_RATE, test_size=TEST_SIZE):
+    # fine-tunes the saved model on new partitions + replay sample and promotes it only if
+    # held-out mse doesn't regress. the saved scalers are kept as they are, since the
+    # existing weights only make sense in the input space they were trained in.
+    # returns the metrics dict, or None when there is nothing to do
+    store = store or HistoryStore()
+    model_path = os.path.join(base_dir, 'wave_prediction_model.keras')
+    if not os.path.exists(model_path):
+        print(f"error: no model at {model_path} to warm start from. run a full training first.")
+        return None
+
+    state = load_training_state(base_dir)
+    fresh = new_partitions(store, state)
+    if not fresh:
+        print("no new partitions since the last training run. nothing to do.")
+        return None
+    if state is None:
+        print("no training state found, fine-tuning on every partition.")
+
+    started = time.perf_counter()
+    df = load_fine_tune_data(store, fresh, replay_fraction)
+    if df.empty:
+        print("error: no rows in the new partitions.")
+        return None
+
+    scaler_x = joblib.load(os.path.join(base_dir, 'scaler_X.pkl'))
+    scaler_y = joblib.load(os.path.join(base_dir, 'scaler_y.pkl'))
+    held_out = holdout_mask(df['time'], test_size)
+    x = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.float32)
+    x_train, y_train, x_val, y_val = x[~held_out], y[~held_out], x[held_out], y[held_out]
+    if len(x_val) == 0 or len(x_train) == 0:
+        print("error: not enough new rows for a train/validation split.")
+        return None
+
+    baseline = keras.models.load_model(model_path, compile=False)
+    val_mse_before = mse_in_score_units(baseline, scaler_x, scaler_y, x_val, y_val)
+
+    model = keras.models.load_model(model_path, compile=False)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate), loss='mean_squared_error')
+    print(f"fine-tuning on {len(x_train)} rows from {len(fresh)} new partitions + replay sample...")
+    model.fit(scale_features(scaler_x, x_train), scaler_y.transform(y_train.reshape(-1, 1)),
+              validation_data=(scale_features(scaler_x, x_val), scaler_y.transform(y_val.reshape(-1, 1))),
+              epochs=epochs, batch_size=batch_size, verbose=1,
+              callbacks=[keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience,
+                                                       restore_best_weights=True)])
+    val_mse = mse_in_score_units(model, scaler_x, scaler_y, x_val, y_val)
+
+    metrics = {
+        'mode': 'warm-start',
+        'train_rows': len(x_train),
+        'new_partitions': [f"{spot}/{month}" for spot, month, _ in fresh],
+        'val_mse_before': val_mse_before,
+        'val_mse': val_mse,
+        'promoted': val_mse <= val_mse_before,
+        'train_time_s': time.perf_counter() - started,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if metrics['promoted']:
+        save_model_and_scalers(model, scaler_x, scaler_y, base_dir=base_dir, metrics=metrics)
+        save_training_state(store, metrics, base_dir)
+    else:
+        print(f"fine-tuned model regressed (held-out mse {val_mse:.4f} > {val_mse_before:.4f}), keeping the current one.")
+    return metrics
+
+
+def report(metrics):
+    print(f"\n{metrics['mode']} training: {metrics['train_rows']} rows in {metrics['train_time_s']:.1f}s, "
+          f"held-out mse {metrics['val_mse']:.4f}, peak rss {metrics['peak_rss_mb']:.0f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="train the wave quality model")
+    parser.add_argument('--streaming', action='store_true',
+                        help="stream batches from the history store instead of loading everything into memory")
+    parser.add_argument('--warm-start', action='store_true',
+                        help="fine-tune the current model on partitions added since the last training run")
+    parser.add_argument('--epochs', type=int, default=None,
+                        help=f"default: 100, or {WARM_START_EPOCHS} with early stopping for --warm-start")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--shuffle-buffer', type=int, default=SHUFFLE_BUFFER, help="rows (streaming mode)")
+    parser.add_argument('--replay-fraction', type=float, default=REPLAY_FRACTION,
+                        help="share of older rows replayed during --warm-start")
+    args = parser.parse_args(argv)
+
+    if args.warm_start:
+        metrics = warm_start(epochs=args.epochs or WARM_START_EPOCHS, batch_size=args.batch_size,
+                             replay_fraction=args.replay_fraction)
+        if metrics is not None:
+            report(metrics)
+            print(f"held-out mse before fine-tuning {metrics['val_mse_before']:.4f}, "
+                  f"{'promoted' if metrics['promoted'] else 'not promoted'}")
+        return metrics
+
+    args.epochs = args.epochs or 100
+    if args.streaming:
+        result = train_streaming(epochs=args.epochs, batch_size=args.batch_size, shuffle_buffer=args.shuffle_buffer)
+        if result is None:
+            print(f"error: no training data found in '{HistoryStore().root}'.")
+            print("please run 'data_collector.py' first to generate the historical data.")
+            return None
     else:
-        # load and drop if missing
-        df = pd.read_csv(file_path, parse_dates=['time'])
-        df.dropna(inplace=True)
+        df = load_training_data()
 
+        if df is None:
+            print(f"error: no training data found in '{HistoryStore().root}' or '{CSV_PATH}'.")
+            print("please run 'data_collector.py' first to generate the historical data.")
+            return None
         if df.empty:
-            print(
-                "error: empty dataframe after dropping n/a rows.")
-        else:
-            # define features and target
-            features = ['swell_wave_height', 'swell_wave_period',
-                        'wind_speed_10m', 'sea_level_height_msl']
-            target = 'wave_quality_score'
-
-            # check if all required columns exist
-            if not all(col in df.columns for col in features + [target]):
-                print("error missing column in data file.")
-                print(f"required columns: {features + [target]}")
-            else:
-                x = df[features]
-                y = df[target]
-
-                # split the data into training and testing sets
-                x_train, x_test, y_train, y_test = train_test_split(
-                    x, y, test_size=0.2, random_state=42)
-
-                # scale the features and target data
-                scaler_x = StandardScaler()
-                x_train_scaled = scaler_x.fit_transform(x_train)
-
-                scaler_y = StandardScaler()
-                y_train_scaled = scaler_y.fit_transform(
-                    y_train.values.reshape(-1, 1))
-
-                # build and train the model
-                model = build_and_train_model(x_train_scaled, y_train_scaled)
-
-                # save the model and scalers
-                save_model_and_scalers(model, scaler_x, scaler_y)
\ No newline at end of file
+            print("error: empty dataframe after dropping n/a rows.")
+            return None
+        # check if all required columns exist
+        if not all(col in df.columns for col in FEATURES + [TARGET]):
+            print("error missing column in data file.")
+            print(f"required columns: {FEATURES + [TARGET]}")
+            return None
+        result = train_in_memory(df, epochs=args.epochs)
+
+    model, scaler_x, scaler_y, metrics = result
+    report(metrics)
+    # save the model and scalers
+    save_model_and_scalers(model, scaler_x, scaler_y, metrics=metrics)
+    save_training_state(HistoryStore(), metrics)
+    return metrics
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,23 @@
 import streamlit as st
-import pandas as pd
-from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 import kookpy
-from datetime import datetime, timedelta
+from kookpy import charts, metrics
+from kookpy.charts import BG_DARK, BUTTON_BG, GRADIENT_DARK, GRADIENT_LIGHT, GRID_LINE_COLOR, TEXT_LIGHT
+import time
+from datetime import datetime
 import base64
+from functools import lru_cache
+import json
 import numpy as np
 
 
 # page config setup
 st.set_page_config(layout="wide", page_title="Kookpy AI Surf Forecast")
 
-# --- retro theme elements ---
-BG_DARK = "#0E1117"
-TEXT_LIGHT = "#e0d8ff"        # lavender
-GRADIENT_LIGHT = "#B8A2F2"    # Brighter lavender
-GRADIENT_DARK = "#8A5AD0"     # Brighter deep purple
-BUTTON_BG = "#312A45"         # Dark button background
-GRID_LINE_COLOR = "#1f2333"   # greyish dividing lines
+# prometheus/json stage timings on KOOKPY_METRICS_PORT when set (timing itself needs KOOKPY_METRICS=1)
+metrics.start_http_server()
 
+# --- retro theme elements, one palette shared with the forecast chart ---
 st.markdown(
     f"""
     <style>
@@ -214,6 +213,51 @@ def image_to_base64(svg_string):
     return f"data:image/svg+xml;base64,{encoded}"
 
 
+# rendered icons as ready-to-embed data uris. inputs are quantized to what the icon can show
+# (score and wave height to 0.1, wind to 1 km/h and 5 degrees), so every session and rerun
+# showing the same conditions shares one cached uri
+ICON_CACHE_SIZE = 512
+
+
+def quantize(value, step):
+    # nearest multiple of step, NaN passes through
+    if value != value:
+        return value
+    return round(round(value / step) * step, 6)
+
+
+@lru_cache(maxsize=ICON_CACHE_SIZE)
+def _score_icon_uri(score):
+    return image_to_base64(create_score_icon(score))
+
+
+@lru_cache(maxsize=ICON_CACHE_SIZE)
+def _wave_icon_uri(height_ft):
+    return image_to_base64(create_wave_icon(height_ft))
+
+
+@lru_cache(maxsize=ICON_CACHE_SIZE)
+def _wind_icon_uri(speed, direction):
+    return image_to_base64(create_wind_icon(speed, direction))
+
+
+def score_icon_uri(score):
+    return _score_icon_uri(quantize(float(score), 0.1))
+
+
+def wave_icon_uri(height_ft):
+    return _wave_icon_uri(quantize(float(height_ft), 0.1))
+
+
+def wind_icon_uri(speed, direction):
+    return _wind_icon_uri(quantize(float(speed), 1), quantize(float(direction), 5) % 360)
+
+
+# static icons never change, encode them once
+LOGO_URI = image_to_base64(create_logo_svg())
+TIDE_ICON_URI = image_to_base64(create_tide_icon())
+
+
 def create_score_legend():
     # generates the ai quality score legend using streamlit components
     st.markdown("### ai wave quality score explained")
@@ -299,6 +343,10 @@ def create_description_ui():
         )
 
 # CRUD Management Functions
+# shown when the password hashing queue is full (a login burst), nothing was changed
+BUSY_MESSAGE = "the server is busy right now, please try again in a few seconds."
+
+
 def create_account_management_ui():
     st.subheader("account management")
 
@@ -317,12 +365,17 @@ def create_account_management_ui():
             elif len(new_pass1) < 6:
                 st.error("password must be at least 6 characters long.")
             else:
-                if kookpy.user_db.modify_user(username, new_pass1):
+                try:
+                    updated = kookpy.user_db.modify_user(username, new_pass1)
+                except kookpy.HashingBusyError:
+                    st.error(BUSY_MESSAGE)
+                    updated = None
+                if updated:
                     st.success("password updated successfully! please sign in again.")
                     st.session_state.logged_in = False
                     st.session_state.username = None
                     st.rerun()
-                else:
+                elif updated is False:
                     st.error("failed to update password.")
 
     # DELETE ACCOUNT BUTTON
@@ -366,12 +419,23 @@ def login_form():
                 password = st.text_input("password", type="password", key="login_pass")
 
                 if st.button("login", key="login_main_button"):
-                    if kookpy.user_db.verify_user(username, password):
+                    # st.context.ip_address is only there on newer streamlit versions
+                    client_ip = getattr(getattr(st, 'context', None), 'ip_address', None)
+                    if kookpy.user_db.is_rate_limited(username, client_ip):
+                        st.error("too many failed logins. wait a minute and try again.")
+                        verified = None
+                    else:
+                        try:
+                            verified = kookpy.user_db.verify_user(username, password, client_ip=client_ip)
+                        except kookpy.HashingBusyError:
+                            st.error(BUSY_MESSAGE)
+                            verified = None
+                    if verified:
                         st.session_state.logged_in = True
                         st.session_state.username = username
                         st.success(f"welcome back, {username}!")
                         st.rerun()
-                    else:
+                    elif verified is False:
                         st.error("invalid username or password")
 
             elif choice == "sign up":
@@ -381,10 +445,13 @@ def login_form():
                 if st.button("sign up", key="signup_main_button"):
                     # basic validation functionality
                     if len(new_user) > 3 and len(new_pass) > 5:
-                        if kookpy.user_db.add_user(new_user, new_pass):
-                            st.success("account created! please switch to login mode.")
-                        else:
-                            st.error("username already taken.")
+                        try:
+                            if kookpy.user_db.add_user(new_user, new_pass):
+                                st.success("account created! please switch to login mode.")
+                            else:
+                                st.error("username already taken.")
+                        except kookpy.HashingBusyError:
+                            st.error(BUSY_MESSAGE)
                     else:
                         st.error("username must be > 3 chars, password must be > 5 chars.")
 
@@ -413,7 +480,7 @@ def main_app():
     col_logo, col_title, col_spacer, col_manage, col_logout = st.columns([1, 5, 2, 2, 2])
 
     with col_logo:
-        st.image(image_to_base64(create_logo_svg()), width=60)
+        st.image(LOGO_URI, width=60)
 
     with col_title:
         st.title(f"kookpy ai surf forecast - logged in as {st.session_state.username}")
@@ -438,7 +505,7 @@ def main_app():
     st.markdown("## data access protocol")
 
     # user input section
-    tabs = st.tabs(["search by name", "select from list"])
+    tabs = st.tabs(["search by name", "select from list", "compare spots"])
 
     with tabs[0]:
         # unique key assigned to text input
@@ -455,78 +522,85 @@ def main_app():
                 st.rerun() # force immediate update
 
     with tabs[1]:
-        california_beaches = [
-            "huntington beach", "malibu", "montara state beach"
-            "steamer lane", "newport beach", "pacifica state beach",
-            "zuma beach", "venice beach", "manhattan beach", "hermosa beach",
-            "redondo beach", "torrance beach", "cabrillo beach", "dana point", "san onofre",
-            "swami's", "ponto beach", "oceanside harbor", "black's beach",
-            "del mar", "encinitas", "solana beach", "mission beach", "ocean beach",
-            "sunset cliffs", "imperial beach", "fort point",
-            "half moon bay", "bolinas", "stinson beach",
-            "cowell's beach", "seabright beach", "manresa state beach",
-            "moss landing", "marina state beach", "carmel beach", "asilomar state beach",
-            "pismo beach", "avila beach", "cayucos", "cambria",
-            "point conception", "jalama beach", "refugio state beach", "el capitan state beach",
-            "gaviota state park","summerland", "leadbetter beach",
-            "leo carrillo state park", "el matador state beach", "topanga state beach",
-            "surfrider beach", "county line", "zuma", "oxnard shores", "ventura point",
-            "rincon point", "pismo state beach", "grover beach", "santa monica state beach",
-            "dockweiler beach", "san clemente pier",
-            "doheny state beach", "salt creek", "strands beach", "thalia street",
-            "brook street", "main beach, laguna", "table rock beach", "aliso beach",
-            "seal beach", "belmont shore", "long beach",
-            "morro strand state beach", "sunset beach", "bolsa chica state beach",
-            "san elijo state beach"
-        ]
         beach_name_select = st.selectbox(
-            "select a popular california beach:", california_beaches)
+            "select a popular california beach:", kookpy.CALIFORNIA_BEACHES)
         if st.button("get forecast for selected beach", type="primary"):
             st.session_state.run_forecast = True
             st.session_state.beach_name = beach_name_select
             st.rerun() # force immediate update
 
+    with tabs[2]:
+        # every selected spot in one batched pass, ranked by its best few hours
+        compare_spots = st.multiselect(
+            "select spots to compare:", kookpy.CALIFORNIA_BEACHES, default=kookpy.CALIFORNIA_BEACHES[:5], key='compare_spots')
+        if st.button("compare spots", type="primary", key='compare_button'):
+            if not compare_spots:
+                st.error("please select at least one spot.")
+            else:
+                with st.spinner(f"fetching and scoring {len(compare_spots)} spots..."):
+                    try:
+                        st.session_state.compare_result = kookpy.get_surf_forecasts(compare_spots)
+                    except Exception as e:
+                        st.error(
+                            f"prediction failed. have you trained your model by running 'model_trainer.py'? error: {e}")
+
+        if 'compare_result' in st.session_state:
+            best_windows = st.session_state.compare_result['best_windows']
+            if best_windows.empty:
+                st.error("could not find forecasts for those spots. please check your internet connection.")
+            else:
+                st.markdown("### best 3-hour window per spot")
+                compare_columns = {'rank': 'rank', 'spot': 'spot', 'window_start': 'from', 'window_end': 'to',
+                                   'wave_quality_score': 'ai quality score', 'swell_wave_height_ft': 'wave height (ft)',
+                                   'swell_wave_period': 'period (s)', 'wind_speed_10m': 'wind (km/h)'}
+                compare_df = best_windows[list(compare_columns)].round(
+                    {'wave_quality_score': 1, 'swell_wave_height_ft': 1, 'swell_wave_period': 1, 'wind_speed_10m': 1})
+                st.dataframe(compare_df.rename(columns=compare_columns), hide_index=True)
+            if st.session_state.compare_result['missing']:
+                st.warning(f"no forecast for: {', '.join(st.session_state.compare_result['missing'])}")
+
     # forecast and prediction display
     if "run_forecast" in st.session_state and st.session_state.run_forecast:
+        refresh = st.button("refresh forecast", key="refresh_forecast")
+        if refresh:
+            # drop the memoized result and its charts, the fetch below goes upstream again
+            kookpy.invalidate_forecast(st.session_state.beach_name)
+
         with st.spinner(f"fetching data and generating prediction for {st.session_state.beach_name}..."):
-            # get location coordinates first
-            coords = kookpy.geocode_location(st.session_state.beach_name)
-            if not coords:
+            # memoized per (beach, model version, freshness), so reruns from ui clicks reuse the
+            # scored frame. popular beaches come from the precompute scheduler (python -m kookpy.precompute),
+            # anything else: geocode once, then fetch marine + wind concurrently (tides come from the marine data)
+            try:
+                forecast = kookpy.get_scored_forecast(st.session_state.beach_name, refresh=refresh)
+            except Exception as e:
+                st.error(
+                    f"prediction failed. have you trained your model by running 'model_trainer.py'? error: {e}")
+                st.session_state.run_forecast = False
+                st.stop()
+            if not forecast:
                 st.error("could not find coordinates for that location.")
                 st.session_state.run_forecast = False
                 st.stop()
 
-            # get data using the coordinates
-            forecast_df = kookpy.get_surf_forecast_by_name(
-                st.session_state.beach_name)
+            # the cached frame is shared with other sessions, work on a copy
+            forecast_df = forecast['forecast'].copy()
 
             if forecast_df.empty:
                 st.error(
                     "could not find forecast for that location. please try another name or check your internet connection.")
                 st.session_state.run_forecast = False
             else:
-                try:
-                    # ensure the dataframe has the columns needed for prediction
-                    required_features = [
-                        'swell_wave_height', 'swell_wave_period', 'wind_speed_10m', 'sea_level_height_msl']
-                    if not all(feature in forecast_df.columns for feature in required_features):
-                        st.error(
-                            "forecast data is missing required features for ai prediction.")
-                        st.session_state.run_forecast = False
-                        st.stop()
-
-                    forecast_df['wave_quality_score'] = forecast_df.apply(
-                        lambda row: kookpy.predict_surf_quality(row), axis=1
-                    )
-                except Exception as e:
+                # ensure the dataframe has the columns needed for prediction
+                required_features = [
+                    'swell_wave_height', 'swell_wave_period', 'wind_speed_10m', 'sea_level_height_msl']
+                if not all(feature in forecast_df.columns for feature in required_features):
                     st.error(
-                        f"prediction failed. have you trained your model by running 'model_trainer.py'? error: {e}")
+                        "forecast data is missing required features for ai prediction.")
                     st.session_state.run_forecast = False
                     st.stop()
 
-                # get tide data for the next 48 hours to find high/low tides
-                tide_data = kookpy.fetch_tide_data(coords['latitude'], coords['longitude'], datetime.now(
-                ).date().strftime('%Y-%m-%d'), (datetime.now().date() + timedelta(days=2)).strftime('%Y-%m-%d'))
+                # next high/low tides, from the same turning points the chart marks
+                tide_data = kookpy.next_tides(forecast['tide_events'])
 
                 forecast_df['swell_wave_height_ft'] = forecast_df['swell_wave_height'] * 3.281
 
@@ -547,25 +621,19 @@ def main_app():
 
                     with col1:
                         st.markdown(f"**ai quality score**")
-                        score_icon_svg = create_score_icon(
-                            now_df['wave_quality_score'])
-                        st.image(image_to_base64(score_icon_svg), width=200)
+                        st.image(score_icon_uri(now_df['wave_quality_score']), width=200)
 
                     with col2:
                         st.markdown(f"**current wave height**")
                         st.markdown(
                             f"<p style='font-size: 30px; margin: 0; color: {TEXT_LIGHT}; font-family: VT323, monospace;'>{now_df['swell_wave_height_ft']:.1f} ft</p>", unsafe_allow_html=True)
-                        wave_icon_svg = create_wave_icon(
-                            now_df['swell_wave_height_ft'])
-                        st.image(image_to_base64(wave_icon_svg), width=100)
+                        st.image(wave_icon_uri(now_df['swell_wave_height_ft']), width=100)
 
                     with col3:
                         st.markdown(f"**current wind**")
                         st.markdown(
                             f"<p style='font-size: 30px; margin: 0; color: {TEXT_LIGHT}; font-family: VT323, monospace;'>{now_df['wind_speed_10m']:.1f} km/h</p>", unsafe_allow_html=True)
-                        wind_icon_svg = create_wind_icon(
-                            now_df['wind_speed_10m'], now_df['wind_direction_10m'])
-                        st.image(image_to_base64(wind_icon_svg), width=100)
+                        st.image(wind_icon_uri(now_df['wind_speed_10m'], now_df['wind_direction_10m']), width=100)
 
                     with col4:
                         st.markdown(f"**tide**")
@@ -580,8 +648,7 @@ def main_app():
                             st.markdown(
                                 f"<p style='font-size: 30px; margin: 0; color: {TEXT_LIGHT};'>n/a</p>", unsafe_allow_html=True)
                             st.write("tide data not available.")
-                        tide_icon_svg = create_tide_icon()
-                        st.image(image_to_base64(tide_icon_svg), width=100)
+                        st.image(TIDE_ICON_URI, width=100)
 
                 st.markdown("---")
                 st.subheader("7-day forecast")
@@ -600,113 +667,18 @@ def main_app():
                 create_score_legend()
 
                 # --- visualization ---
-                forecast_df_3hr = forecast_df[forecast_df['time'].dt.hour % 3 == 0]
-
-                fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.1,
-                                    subplot_titles=(f"swell wave height and predicted quality for {st.session_state.beach_name}", "wind speed forecast", "tide forecast"))
-
-                # --- wave height bar chart ---
-                # colorscale from youtube vid
-                fig.add_trace(go.Bar(
-                    x=forecast_df_3hr['time'],
-                    y=forecast_df_3hr['swell_wave_height_ft'],
-                    marker_color=forecast_df_3hr['wave_quality_score'],
-                    marker_colorscale=[[0, '#AA55AA'], [0.5, '#5555FF'], [1, '#11CCCC']], # Score 1 (Dark Purple) -> Score 10 (Light Cyan)
-                    marker_cmin=1,
-                    marker_cmax=10,
-                    hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>wave height: %{y:.2f} ft<br>quality score: %{marker.color:.1f}<extra></extra>",
-                    name="wave height",
-                    showlegend=False
-                ), row=1, col=1)
-
-                # vertical dashed lines for each day and date headers
-                dates = pd.to_datetime(forecast_df['time']).dt.date.unique()
-                for i, date in enumerate(dates):
-                    date_str = date.strftime('%Y-%m-%d')
-                    fig.add_vline(x=date_str, line_width=1, line_dash="dash",
-                                  line_color=GRADIENT_DARK, opacity=0.5, row=1, col=1)
-                    fig.add_vline(x=date_str, line_width=1, line_dash="dash",
-                                  line_color=GRADIENT_DARK, opacity=0.5, row=2, col=1)
-                    fig.add_vline(x=date_str, line_width=1, line_dash="dash",
-                                  line_color=GRADIENT_DARK, opacity=0.5, row=3, col=1)
-
-                    if i < len(dates) - 1:
-                        mid_point = date + (dates[i+1] - date) / 2
-                        fig.add_annotation(
-                            x=mid_point,
-                            y=-1.05,
-                            text=date.strftime('%b %d'),
-                            xref="x",
-                            yref="paper",
-                            font=dict(color=TEXT_LIGHT, size=16, family="VT323, monospace")
-                        )
-
-                # wind speed line chart
-                fig.add_trace(go.Scatter(
-                    x=forecast_df['time'],
-                    y=forecast_df['wind_speed_10m'],
-                    mode='lines',
-                    name='wind speed (km/h)',
-                    line=dict(color=GRADIENT_DARK, dash='dot'),
-                    hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>wind speed: %{y:.2f} km/h<extra></extra>"
-                ), row=2, col=1)
-
-                # tide chart
-                fig.add_trace(go.Scatter(
-                    x=forecast_df['time'],
-                    y=forecast_df['sea_level_height_msl'],
-                    mode='lines',
-                    name='sea level height',
-                    line=dict(color=GRADIENT_LIGHT),
-                    hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>tide: %{y:.2f} m<extra></extra>"
-                ), row=3, col=1)
-
-                high_tides = forecast_df[forecast_df['sea_level_height_msl'] == forecast_df['sea_level_height_msl'].rolling(
-                    window=3, center=True).max()].dropna()
-                low_tides = forecast_df[forecast_df['sea_level_height_msl'] == forecast_df['sea_level_height_msl'].rolling(
-                    window=3, center=True).min()].dropna()
-
-                fig.add_trace(go.Scatter(
-                    x=high_tides['time'],
-                    y=high_tides['sea_level_height_msl'],
-                    mode='markers',
-                    name='high tide',
-                    marker=dict(symbol='triangle-up', size=10, color=GRADIENT_DARK),
-                    hovertemplate="<b>high tide</b><br>date: %{x|%b %d, %I:%M %p}</b><br>height: %{y:.2f} m<extra></extra>"
-                ), row=3, col=1)
-
-                fig.add_trace(go.Scatter(
-                    x=low_tides['time'],
-                    y=low_tides['sea_level_height_msl'],
-                    mode='markers',
-                    name='low tide',
-                    marker=dict(symbol='triangle-down', size=10, color=GRADIENT_LIGHT),
-                    hovertemplate="<b>low tide</b><br>date: %{x|%b %d, %I:%M %p}</b><br>height: %{y:.2f} m<extra></extra>"
-                ), row=3, col=1)
-
-                fig.update_yaxes(title_text="swell wave height (ft)", row=1, col=1, title_font=dict(family="VT323, monospace"))
-                fig.update_yaxes(title_text="wind speed (km/h)", row=2, col=1, title_font=dict(family="VT323, monospace"))
-                fig.update_yaxes(title_text="sea level (m)", row=3, col=1, title_font=dict(family="VT323, monospace"))
-                fig.update_xaxes(title_text="date and time", row=3, col=1, title_font=dict(family="VT323, monospace"))
-
-                # layout update for the retro theme
-                fig.update_layout(hovermode="x unified",
-                                  plot_bgcolor='rgba(0,0,0,0)',
-                                  paper_bgcolor='rgba(0,0,0,0)',
-                                  font=dict(family="VT323, monospace"),
-                                  font_color=TEXT_LIGHT,
-                                  xaxis_gridcolor=GRID_LINE_COLOR,
-                                  yaxis_gridcolor=GRID_LINE_COLOR,
-                                  margin=dict(b=100))
-                fig.update_layout(height=1000)
-
-                fig.update_layout(
-                    title_text=f"swell wave height and predicted quality for {st.session_state.beach_name}",
-                    legend=dict(orientation="h", yanchor="bottom",
-                                y=1.02, xanchor="right", x=1)
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+                resolution_labels = {'1h': "hourly", '3h': "3-hourly", 'minmax': "3-hour min/max"}
+                resolution = st.radio("wind and tide chart resolution", charts.RESOLUTIONS, horizontal=True,
+                                      format_func=resolution_labels.get, key='chart_resolution')
+                # the chart json is built once per forecast and shared across sessions. this
+                # session keeps the figure object too, so reruns skip re-validating the spec
+                chart_json = kookpy.get_forecast_figure_json(forecast, st.session_state.beach_name, resolution)
+                if st.session_state.get('chart_json') is not chart_json:
+                    chart_started = time.perf_counter()
+                    st.session_state.chart_fig = go.Figure(json.loads(chart_json))
+                    st.session_state.chart_json = chart_json
+                    metrics.observe('app.build_chart', time.perf_counter() - chart_started)
+                st.plotly_chart(st.session_state.chart_fig, use_container_width=True)
 
 # --- run application ---
 
@@ -732,7 +704,7 @@ else:
         # Header: Logo, Title (Centered)
         col_logo, col_title = st.columns([1, 10])
         with col_logo:
-            st.image(image_to_base64(create_logo_svg()), width=60)
+            st.image(LOGO_URI, width=60)
         with col_title:
             st.title("welcome to kookpy ai surf forecast")
             st.markdown("### powered by the open-meteo api and tensorflow")
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from kookpy.auth import BCRYPT_ROUNDS, HashingBusyError, UserDatabase
+
+# sustained login throughput for UserDatabase with many threads hitting it at once.
+# every worker logs in repeatedly, and every `write_every`-th call is a password change so
+# readers and writers contend for the file the way concurrent streamlit sessions do.
+#
+#   python -m benchmarks.bench_user_db --threads 32 --duration 10
+
+
+def run_benchmark(threads=16, duration=5.0, users=50, write_every=10, db_path=None,
+                  bcrypt_rounds=BCRYPT_ROUNDS, hash_workers=2):
+    tmp_dir = None
+    if db_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, 'bench_user_data.db')
+
+    db = UserDatabase(db_path=db_path, pool_size=threads, bcrypt_rounds=bcrypt_rounds,
+                      hash_workers=hash_workers, max_pending_hashes=threads)
+    for i in range(users):
+        db.add_user(f"bench_user_{i}", "bench_password")
+
+    latencies = []
+    counts = {'logins': 0, 'writes': 0, 'locked_errors': 0, 'busy_rejections': 0, 'other_errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        local_latencies = []
+        local_counts = dict.fromkeys(counts, 0)
+        call = 0
+        while time.perf_counter() < deadline:
+            username = f"bench_user_{(worker_id + call) % users}"
+            start = time.perf_counter()
+            try:
+                if write_every and call % write_every == write_every - 1:
+                    db.modify_user(username, "bench_password")
+                    local_counts['writes'] += 1
+                else:
+                    db.verify_user(username, "bench_password")
+                    local_counts['logins'] += 1
+                local_latencies.append(time.perf_counter() - start)
+            except HashingBusyError:
+                local_counts['busy_rejections'] += 1
+            except sqlite3.OperationalError as e:
+                key = 'locked_errors' if 'locked' in str(e) else 'other_errors'
+                local_counts[key] += 1
+            except Exception:
+                local_counts['other_errors'] += 1
+            call += 1
+        with lock:
+            latencies.extend(local_latencies)
+            for key, value in local_counts.items():
+                counts[key] += value
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    hash_metrics = db.hash_metrics
+    db.close()
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        'benchmark': 'user_db_logins',
+        'threads': threads,
+        'bcrypt_rounds': bcrypt_rounds,
+        'hash_workers': hash_workers,
+        'duration_s': round(elapsed, 3),
+        'logins_per_s': round(counts['logins'] / elapsed, 2),
+        'ops_per_s': round((counts['logins'] + counts['writes']) / elapsed, 2),
+        'latency_p50_ms': round(quantiles[49] * 1000, 3),
+        'latency_p95_ms': round(quantiles[94] * 1000, 3),
+        'latency_p99_ms': round(quantiles[98] * 1000, 3),
+        **counts,
+        'hash_latency_avg_ms': round(hash_metrics['hash_latency_avg_ms'], 3),
+        'hash_latency_p95_ms': round(hash_metrics['hash_latency_p95_ms'], 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UserDatabase concurrent login benchmark")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds to run")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--write-every', type=int, default=10, help="every nth call changes a password (0 = reads only)")
+    parser.add_argument('--rounds', type=int, default=BCRYPT_ROUNDS, help="bcrypt work factor")
+    parser.add_argument('--hash-workers', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run_benchmark(args.threads, args.duration, args.users, args.write_every,
+                                   bcrypt_rounds=args.rounds, hash_workers=args.hash_workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+# local stand-in for open-meteo that replays recorded responses, so the benchmarks
+# measure kookpy and not the internet. hourly series are re-stamped onto whatever
+# date range a request asks for, cycling the recorded values.
+#
+#   python -m benchmarks.fake_open_meteo record --latitude 33.54 --longitude -117.78
+#   python -m benchmarks.fake_open_meteo serve --port 8765
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), 'payloads')
+
+# request path -> recorded payload file
+PAYLOAD_FILES = {
+    '/v1/search': 'geocoding.json',
+    '/v1/marine': 'marine.json',
+    '/v1/forecast': 'weather.json',
+    '/v1/archive': 'archive.json',
+}
+
+# what `record` asks the live api for (the same variables kookpy requests)
+RECORD_REQUESTS = {
+    'geocoding.json': ('https://geocoding-api.open-meteo.com/v1/search', {'name': 'laguna beach'}),
+    'marine.json': ('https://marine-api.open-meteo.com/v1/marine',
+                    {'hourly': 'swell_wave_height,swell_wave_period,wave_direction,sea_level_height_msl'}),
+    'weather.json': ('https://api.open-meteo.com/v1/forecast', {'hourly': 'wind_speed_10m,wind_direction_10m'}),
+    'archive.json': ('https://archive-api.open-meteo.com/v1/archive', {'hourly': 'wind_speed_10m,wind_direction_10m'}),
+}
+
+
+def load_payloads(payload_dir=PAYLOAD_DIR):
+    payloads = {}
+    for path, file_name in PAYLOAD_FILES.items():
+        with open(os.path.join(payload_dir, file_name)) as f:
+            payloads[path] = json.load(f)
+    return payloads
+
+
+def restamp(payload, query):
+    # the recorded hourly series stretched or cut to the requested dates and variables
+    start = datetime.strptime(query['start_date'][0], '%Y-%m-%d')
+    end = datetime.strptime(query['end_date'][0], '%Y-%m-%d')
+    hours = int((end - start).total_seconds() // 3600) + 24
+    recorded = payload['hourly']
+
+    hourly = {'time': [(start + timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M') for h in range(hours)]}
+    for variable in query['hourly'][0].split(','):
+        values = recorded.get(variable) or [0.0]
+        hourly[variable] = np.resize(np.asarray(values, dtype=float), hours).round(2).tolist()
+    # comma separated coordinates get a list of locations back, like the real api
+    locations = [{'latitude': float(latitude), 'longitude': float(longitude), 'hourly': hourly}
+                 for latitude, longitude in zip(query['latitude'][0].split(','), query['longitude'][0].split(','))]
+    return locations if len(locations) > 1 else locations[0]
+
+
+class FakeOpenMeteoServer:
+    # threaded http server replaying the payloads. `latency` adds a fixed delay per
+    # response to mimic the round trip to the real api. `payloads` ({path: payload}) replaces
+    # the recorded files. every request is kept in `requests`, and `handlers[path]` can
+    # take over a path with a function (path, query) -> (status, body), e.g. to inject failures
+    def __init__(self, payload_dir=PAYLOAD_DIR, latency=0.0, port=0, payloads=None):
+        self.payloads = payloads if payloads is not None else load_payloads(payload_dir)
+        self.latency = latency
+        self.counts = dict.fromkeys(PAYLOAD_FILES, 0)
+        self.requests = []
+        self.handlers = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body go out as separate writes, without this nagle + delayed acks
+            # add ~40ms to every keep-alive response and swamp what is being measured
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                with fake._lock:
+                    fake.requests.append((parsed.path, query))
+                    if parsed.path in fake.counts:
+                        fake.counts[parsed.path] += 1
+                handler = fake.handlers.get(parsed.path, fake.default_handler)
+                status, body = handler(parsed.path, query)
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # clients hanging up early (timeouts) are expected
+                pass
+
+        self.server = Server(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def default_handler(self, path, query):
+        # the payload for the path, hourly series re-stamped to the requested range
+        payload = self.payloads.get(path)
+        if payload is None:
+            return 404, {'error': True, 'reason': f"unknown path {path}"}
+        if 'hourly' in payload:
+            return 200, restamp(payload, query)
+        return 200, payload
+
+    def count(self, path):
+        with self._lock:
+            return sum(1 for request_path, _ in self.requests if request_path == path)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+@contextmanager
+def patched_kookpy(server, cache_path=None):
+    # points the kookpy api urls at the fake server with a fresh session, and a cache at
+    # cache_path (None turns caching off). everything is restored afterwards
+    import kookpy.api as api
+
+    saved_urls = (api.GEOCODING_API_URL, api.MARINE_API_URL, api.WEATHER_API_URL, api.HISTORICAL_WEATHER_API_URL)
+    saved = (api.BaseWeatherAPI._session, api.BaseWeatherAPI._cache, api.BaseWeatherAPI._cache_enabled)
+    api.GEOCODING_API_URL = f"{server.url}/v1/search"
+    api.MARINE_API_URL = f"{server.url}/v1/marine"
+    api.WEATHER_API_URL = f"{server.url}/v1/forecast"
+    api.HISTORICAL_WEATHER_API_URL = f"{server.url}/v1/archive"
+    api.BaseWeatherAPI._session = None
+    api.BaseWeatherAPI._cache = None
+    try:
+        if cache_path is None:
+            api.BaseWeatherAPI.configure_cache(enabled=False)
+        else:
+            api.BaseWeatherAPI.configure_cache(path=cache_path)
+        yield api
+    finally:
+        if api.BaseWeatherAPI._session is not None:
+            api.BaseWeatherAPI._session.close()
+        if api.BaseWeatherAPI._cache is not None:
+            api.BaseWeatherAPI._cache.close()
+        (api.GEOCODING_API_URL, api.MARINE_API_URL, api.WEATHER_API_URL, api.HISTORICAL_WEATHER_API_URL) = saved_urls
+        api.BaseWeatherAPI._session, api.BaseWeatherAPI._cache, api.BaseWeatherAPI._cache_enabled = saved
+
+
+def record(latitude, longitude, payload_dir=PAYLOAD_DIR):
+    # replaces the payloads with real responses from open-meteo (needs network access)
+    import requests
+
+    today = datetime.now().date()
+    forecast_range = {'start_date': today.strftime('%Y-%m-%d'),
+                      'end_date': (today + timedelta(days=6)).strftime('%Y-%m-%d')}
+    # the whole of last month for the archive
+    last_month_end = today.replace(day=1) - timedelta(days=1)
+    archive_range = {'start_date': last_month_end.replace(day=1).strftime('%Y-%m-%d'),
+                     'end_date': last_month_end.strftime('%Y-%m-%d')}
+
+    os.makedirs(payload_dir, exist_ok=True)
+    for file_name, (url, params) in RECORD_REQUESTS.items():
+        params = dict(params)
+        if 'hourly' in params:
+            params.update(latitude=latitude, longitude=longitude)
+            params.update(archive_range if file_name == 'archive.json' else forecast_range)
+        response = requests.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(payload_dir, file_name), 'w') as f:
+            json.dump(response.json(), f)
+        print(f"recorded {file_name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fake open-meteo server for the benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help="record fresh payloads from the live api")
+    record_parser.add_argument('--latitude', type=float, default=33.54)
+    record_parser.add_argument('--longitude', type=float, default=-117.78)
+    serve_parser = subparsers.add_parser('serve', help="serve the recorded payloads until interrupted")
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record(args.latitude, args.longitude)
+        return
+
+    server = FakeOpenMeteoServer(latency=args.latency, port=args.port).start()
+    print(f"serving recorded open-meteo payloads on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# end-to-end benchmarks for the forecast pipeline against recorded open-meteo payloads.
+# every stage reports latency percentiles, throughput and peak traced memory as json,
+# so two commits can be compared by diffing the output.
+#
+#   python -m benchmarks.run --output bench.json
+#   python -m benchmarks.run --stages forecast_cold predict_batch --repeat 50
+
+STAGES = ['forecast_cold', 'forecast_warm', 'tides', 'predict_batch', 'predict_row',
+          'compare', 'collector', 'trainer', 'user_db']
+
+# made-up spot name so geocoding goes to the (fake) api instead of the gazetteer
+BENCH_SPOT = "bench point"
+
+
+def measure(name, func, repeat=20, warmup=1, items=1, setup=None):
+    # times `repeat` calls of func after `warmup` untimed ones, then one more call under
+    # tracemalloc for peak python/numpy allocation. `items` is the work per call for throughput
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    latencies = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    quantiles = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+    return {
+        'benchmark': name,
+        'repeat': repeat,
+        'latency_mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'latency_p50_ms': round(quantiles[49] * 1000, 3),
+        'latency_p95_ms': round(quantiles[94] * 1000, 3),
+        'latency_p99_ms': round(quantiles[98] * 1000, 3),
+        'throughput_per_s': round(items * len(ordered) / sum(ordered), 2) if sum(ordered) else None,
+        'items_per_call': items,
+        'peak_traced_mb': round(peak / (1024 * 1024), 3),
+    }
+
+
+def bench_forecast(server, tmp_dir, repeat, warm):
+    # full get_surf_forecast_by_name: geocode + concurrent marine/wind + merge.
+    # cold = every call goes upstream, warm = served from the response cache
+    import kookpy
+    from benchmarks.fake_open_meteo import patched_kookpy
+
+    cache_path = os.path.join(tmp_dir, 'bench_cache.db') if warm else None
+    with patched_kookpy(server, cache_path):
+        rows = len(kookpy.get_surf_forecast_by_name(BENCH_SPOT))
+        return measure('forecast_warm' if warm else 'forecast_cold',
+                       lambda: kookpy.get_surf_forecast_by_name(BENCH_SPOT), repeat, items=rows)
+
+
+def bench_tides(server, repeat):
+    import kookpy
+    from benchmarks.fake_open_meteo import patched_kookpy
+
+    with patched_kookpy(server):
+        start, end = kookpy.api._forecast_dates()
+        return measure('tides', lambda: kookpy.fetch_tide_data(33.54, -117.78, start, end), repeat)
+
+
+def _forecast_frame(server):
+    import kookpy
+    from benchmarks.fake_open_meteo import patched_kookpy
+
+    with patched_kookpy(server):
+        return kookpy.get_surf_forecast_by_name(BENCH_SPOT)
+
+
+def bench_predict_batch(server, repeat):
+    # one batched prediction over the 7-day hourly frame
+    import kookpy
+
+    forecast_df = _forecast_frame(server)
+    return measure('predict_batch', lambda: kookpy.predict_surf_quality_batch(forecast_df), repeat,
+                   items=len(forecast_df))
+
+
+def bench_predict_row(server, repeat):
+    # single-row predictions, the per-hour call pattern
+    import kookpy
+
+    forecast_df = _forecast_frame(server)
+    row = forecast_df.iloc[0]
+    return measure('predict_row', lambda: kookpy.predict_surf_quality(row), repeat * 5)
+
+
+def bench_compare(server, repeat, spots=20):
+    # get_surf_forecasts over `spots` already geocoded spots: one multi-location request per
+    # endpoint plus one batched prediction, to hold against forecast_cold for a single spot
+    import kookpy
+    from benchmarks.fake_open_meteo import patched_kookpy
+
+    coords = {f"{BENCH_SPOT} {i}": {'latitude': 33.0 + i * 0.05, 'longitude': -117.78} for i in range(spots)}
+    with patched_kookpy(server):
+        return measure('compare', lambda: kookpy.get_surf_forecasts(list(coords), coords=coords), repeat,
+                       items=spots)
+
+
+def bench_collector(server, tmp_dir, repeat, months=12):
+    # a year of history into an empty store: 12 month windows of marine + archive calls
+    from ai.data_collector import collect_into_store
+    from ai.history_store import HistoryStore
+    from benchmarks.fake_open_meteo import patched_kookpy
+
+    stores = []
+
+    def fresh_store():
+        stores.append(HistoryStore(tempfile.mkdtemp(dir=tmp_dir)))
+
+    def collect():
+        collect_into_store(BENCH_SPOT, "2023-01-01", f"2023-{months:02d}-28", stores[-1])
+
+    with patched_kookpy(server):
+        result = measure('collector', collect, max(1, repeat // 10), warmup=0, items=months, setup=fresh_store)
+    result['rows_per_call'] = len(stores[-1].read(['time']))
+    return result
+
+
+def bench_trainer(repeat, rows=50000, epochs=2):
+    # in-memory training on a synthetic frame of `rows` rows
+    import numpy as np
+    import pandas as pd
+    from ai.model_trainer import FEATURES, TARGET, train_in_memory
+    import kookpy
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'swell_wave_height': rng.uniform(0.2, 3.0, rows),
+        'swell_wave_period': rng.uniform(5.0, 18.0, rows),
+        'wind_speed_10m': rng.uniform(0.0, 30.0, rows),
+        'sea_level_height_msl': rng.uniform(-0.5, 1.5, rows),
+    })
+    df[TARGET] = kookpy.calculate_heuristic_score_vectorized(df)
+
+    result = measure('trainer', lambda: train_in_memory(df[FEATURES + [TARGET]], epochs=epochs),
+                     max(1, repeat // 20), warmup=0, items=rows)
+    result['epochs'] = epochs
+    return result
+
+
+def bench_user_db(duration):
+    from benchmarks.bench_user_db import run_benchmark
+
+    return run_benchmark(threads=8, duration=duration, bcrypt_rounds=10)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(stages=STAGES, repeat=20, upstream_latency=0.0, user_db_duration=3.0):
+    # runs the selected stages against one fake server and returns the json-ready report
+    from benchmarks.fake_open_meteo import FakeOpenMeteoServer
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeOpenMeteoServer(latency=upstream_latency) as server:
+        for stage in stages:
+            if stage == 'forecast_cold':
+                results.append(bench_forecast(server, tmp_dir, repeat, warm=False))
+            elif stage == 'forecast_warm':
+                results.append(bench_forecast(server, tmp_dir, repeat, warm=True))
+            elif stage == 'tides':
+                results.append(bench_tides(server, repeat))
+            elif stage == 'predict_batch':
+                results.append(bench_predict_batch(server, repeat))
+            elif stage == 'predict_row':
+                results.append(bench_predict_row(server, repeat))
+            elif stage == 'compare':
+                results.append(bench_compare(server, repeat))
+            elif stage == 'collector':
+                results.append(bench_collector(server, tmp_dir, repeat))
+            elif stage == 'trainer':
+                results.append(bench_trainer(repeat))
+            elif stage == 'user_db':
+                results.append(bench_user_db(user_db_duration))
+            else:
+                raise ValueError(f"unknown benchmark stage '{stage}', choose from {STAGES}")
+        upstream_requests = dict(server.counts)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'upstream_latency_ms': upstream_latency * 1000,
+        'upstream_requests': upstream_requests,
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="forecast pipeline benchmarks against recorded open-meteo payloads")
+    parser.add_argument('--stages', nargs='*', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=20, help="timed calls per stage")
+    parser.add_argument('--upstream-latency', type=float, default=0.0,
+                        help="seconds the fake api waits before every response")
+    parser.add_argument('--user-db-duration', type=float, default=3.0, help="seconds for the login benchmark")
+    parser.add_argument('--output', default=None, help="write the json report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.stages, args.repeat, args.upstream_latency, args.user_db_duration)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"wrote benchmark report to {args.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+import requests
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+from .session import ApiSession
+from .cache import ResponseCache
+from .gazetteer import lookup_location
+from .tides import find_tide_extrema, next_tides
+from . import metrics
+
+# base urls for the open-meteo apis
+GEOCODING_API_URL = "https://geocoding-api.open-meteo.com/v1/search"
+MARINE_API_URL = "https://marine-api.open-meteo.com/v1/marine"
+WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
+HISTORICAL_WEATHER_API_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+
+# --- api classes (inheritance and polymorphism) ---
+
+class BaseWeatherAPI:
+    # base class for all api fetches. implements polymorphism (fetch_data)
+
+    # one pooled session and one response cache shared by every api object and the helper functions below
+    _session = None
+    _session_lock = threading.Lock()
+    _cache = None
+    _cache_enabled = True
+
+    def __init__(self, latitude, longitude, start_date, end_date, refresh=False):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.start_date = start_date
+        self.end_date = end_date
+        # skip the cached response and go upstream, e.g. for an explicit refresh
+        self.refresh = refresh
+
+    @classmethod
+    def get_session(cls):
+        # returns the shared session, creating it with default settings on first use
+        with BaseWeatherAPI._session_lock:
+            if BaseWeatherAPI._session is None:
+                BaseWeatherAPI._session = ApiSession()
+            return BaseWeatherAPI._session
+
+    @classmethod
+    def configure_session(cls, session=None, **kwargs):
+        # swaps in a new shared session, either the one given or ApiSession(**kwargs)
+        with BaseWeatherAPI._session_lock:
+            old_session = BaseWeatherAPI._session
+            BaseWeatherAPI._session = session if session is not None else ApiSession(**kwargs)
+        if old_session is not None and old_session is not BaseWeatherAPI._session:
+            old_session.close()
+        return BaseWeatherAPI._session
+
+    @classmethod
+    def get_cache(cls):
+        # returns the shared response cache, or None when caching is turned off
+        with BaseWeatherAPI._session_lock:
+            if BaseWeatherAPI._cache is None and BaseWeatherAPI._cache_enabled:
+                try:
+                    BaseWeatherAPI._cache = ResponseCache()
+                except Exception as e:
+                    # e.g. a read-only filesystem. serve uncached rather than fail
+                    print(f"error opening response cache, caching disabled: {e}")
+                    BaseWeatherAPI._cache_enabled = False
+            return BaseWeatherAPI._cache
+
+    @classmethod
+    def configure_cache(cls, cache=None, enabled=True, **kwargs):
+        # swaps in a new shared cache (the one given or ResponseCache(**kwargs)), or turns caching off
+        with BaseWeatherAPI._session_lock:
+            old_cache = BaseWeatherAPI._cache
+            BaseWeatherAPI._cache_enabled = enabled
+            if not enabled:
+                BaseWeatherAPI._cache = None
+            else:
+                BaseWeatherAPI._cache = cache if cache is not None else ResponseCache(**kwargs)
+        if old_cache is not None and old_cache is not BaseWeatherAPI._cache:
+            old_cache.close()
+        return BaseWeatherAPI._cache
+
+    @classmethod
+    def fetch_json(cls, url, params, endpoint, refresh=False):
+        # get + json through the shared cache and session. raises requests exceptions like requests.get.
+        # refresh skips the cached copy but still stores the new response
+        cache = cls.get_cache()
+        key = None
+        if cache is not None:
+            key = cache.make_key(endpoint, url, params)
+            data = None if refresh else cache.get(key)
+            if data is not None:
+                return data
+
+        # upstream time only, cache hits never get here
+        with metrics.span(f'upstream.{endpoint}'):
+            response = cls.get_session().get(url, params=params, endpoint=endpoint)
+        response.raise_for_status()
+        data = response.json()
+
+        # only keep real payloads, open-meteo reports problems as {"error": true, ...}.
+        # multi-location requests answer with a list, kept when none of its locations failed
+        locations = data if isinstance(data, list) else [data]
+        if cache is not None and locations and all(isinstance(location, dict) and not location.get('error')
+                                                   for location in locations):
+            cache.set(key, endpoint, data)
+        return data
+
+    def fetch_data(self):
+        raise NotImplementedError("subclasses must implement this method")
+
+    def endpoint(self):
+        # (url, endpoint name) this api calls for its date range
+        raise NotImplementedError("subclasses must implement this method")
+
+    @classmethod
+    def fetch_many(cls, coords_list, start_date, end_date):
+        # one hourly frame per coords, from a single multi-location request: open-meteo takes
+        # comma separated latitudes/longitudes and answers with a list of locations in the same
+        # order. if that request fails or comes back malformed, falls back to one call per coords
+        apis = [cls(coords['latitude'], coords['longitude'], start_date, end_date) for coords in coords_list]
+        if len(apis) <= 1:
+            return [api.fetch_data() for api in apis]
+
+        url, endpoint = apis[0].endpoint()
+        params = {
+            "latitude": ",".join(str(api.latitude) for api in apis),
+            "longitude": ",".join(str(api.longitude) for api in apis),
+            "hourly": cls.HOURLY,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+        try:
+            data = cls.fetch_json(url, params, endpoint)
+            locations = data if isinstance(data, list) else [data]
+            if len(locations) != len(apis) or not all('hourly' in location for location in locations):
+                raise ValueError(f"expected {len(apis)} locations in the response, got {len(locations)}")
+            frames = []
+            for location in locations:
+                df = pd.DataFrame(location['hourly'])
+                df['time'] = pd.to_datetime(df['time'])
+                frames.append(df)
+            return frames
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"error during multi-location {endpoint} api call, fetching one by one: {e}")
+
+        with ThreadPoolExecutor(max_workers=min(8, len(apis))) as pool:
+            return list(pool.map(lambda api: api.fetch_data(), apis))
+
+class OpenMeteoMarineAPI(BaseWeatherAPI):
+    # fetches marine weather data (swell and waves)
+    HOURLY = "swell_wave_height,swell_wave_period,wave_direction,sea_level_height_msl"
+
+    def endpoint(self):
+        return MARINE_API_URL, 'marine'
+
+    @metrics.timed('api.marine')
+    def fetch_data(self):
+        # polymorphism: implements the base fetch_data method
+        url, endpoint = self.endpoint()
+        params = {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "hourly": self.HOURLY,
+            "start_date": self.start_date,
+            "end_date": self.end_date
+        }
+
+        try:
+            data = self.fetch_json(url, params, endpoint, self.refresh)
+            if 'hourly' in data:
+                df = pd.DataFrame(data['hourly'])
+                df['time'] = pd.to_datetime(df['time'])
+                return df
+        except requests.exceptions.RequestException as e:
+            print(f"error during marine api call: {e}")
+            return pd.DataFrame()
+        return pd.DataFrame()
+
+class OpenMeteoWindAPI(BaseWeatherAPI):
+    # fetches wind data (can switch to historical api for past dates)
+    HOURLY = "wind_speed_10m,wind_direction_10m"
+
+    def endpoint(self):
+        is_historical = datetime.strptime(self.start_date, '%Y-%m-%d').date() < datetime.now().date()
+        if is_historical:
+            return HISTORICAL_WEATHER_API_URL, 'archive'
+        return WEATHER_API_URL, 'weather'
+
+    @metrics.timed('api.wind')
+    def fetch_data(self):
+        # polymorphism: implements the base fetch_data method
+        url, endpoint = self.endpoint()
+
+        params = {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "hourly": self.HOURLY,
+            "start_date": self.start_date,
+            "end_date": self.end_date
+        }
+
+        try:
+            data = self.fetch_json(url, params, endpoint, self.refresh)
+            if 'hourly' in data:
+                df = pd.DataFrame(data['hourly'])
+                df['time'] = pd.to_datetime(df['time'])
+                return df
+        except requests.exceptions.RequestException as e:
+            print(f"error during wind api call: {e}")
+            return pd.DataFrame()
+        return pd.DataFrame()
+
+
+# --- core functions ---
+
+@metrics.timed('api.geocode')
+def geocode_location(location_name, use_gazetteer=True):
+    # converts a location name to geographical coords (lat/lon).
+    # curated beaches come from the local gazetteer, everything else goes through the
+    # geocoding api with its responses kept in the persistent cache
+    if use_gazetteer:
+        coords = lookup_location(location_name)
+        if coords:
+            return coords
+
+    try:
+        data = BaseWeatherAPI.fetch_json(GEOCODING_API_URL, {'name': location_name}, 'geocoding')
+        if 'results' in data and data['results']:
+            # return the coords of the first result
+            return {
+                'latitude': data['results'][0]['latitude'],
+                'longitude': data['results'][0]['longitude']
+            }
+    except requests.exceptions.RequestException as e:
+        print(f"error during geocoding api call: {e}")
+        return None
+    return None
+
+@metrics.timed('tides.summarize')
+def summarize_tides(df):
+    # finds the next high and low tides in a frame with time and sea_level_height_msl columns.
+    # legacy helper, the app reads them from get_scored_forecast's tide_events
+    if df.empty or 'sea_level_height_msl' not in df.columns or df['sea_level_height_msl'].isna().all():
+        return None
+
+    # turning points with interpolated times and heights, missing (-999) values skipped
+    events = find_tide_extrema(df['time'], df['sea_level_height_msl'])
+    return next_tides(events)
+
+@metrics.timed('api.tides')
+def fetch_tide_data(latitude, longitude, start_date, end_date):
+    # fetches tide data and finds the next high and low tides.
+    # legacy helper with its own marine request, the app doesn't call it
+    url = MARINE_API_URL
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "hourly": "sea_level_height_msl",
+        "start_date": start_date,
+        "end_date": end_date
+    }
+
+    try:
+        data = BaseWeatherAPI.fetch_json(url, params, 'marine')
+        if 'hourly' in data and data['hourly']['sea_level_height_msl']:
+            df = pd.DataFrame(data['hourly'])
+            df['time'] = pd.to_datetime(df['time'])
+            return summarize_tides(df)
+
+    except requests.exceptions.RequestException as e:
+        print(f"error during tide api call: {e}")
+    except Exception as e:
+        print(f"error processing tide data: {e}")
+    return None
+
+# shared pool for running the upstream calls of one forecast side by side
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
+
+def _get_fetch_pool():
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='kookpy-fetch')
+    return _fetch_pool
+
+def _forecast_dates():
+    # today plus the next 6 days
+    today = datetime.now().date()
+    end_date = today + timedelta(days=6)
+    return today.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+
+def fetch_marine_and_wind(latitude, longitude, start_date, end_date, refresh=False):
+    # runs the marine and wind calls concurrently, so the wait is the slower of the two.
+    # refresh goes upstream even when the response cache has a fresh copy
+    # use the new api classes (polymorphism demo)
+    apis = [
+        OpenMeteoMarineAPI(latitude, longitude, start_date, end_date, refresh),
+        OpenMeteoWindAPI(latitude, longitude, start_date, end_date, refresh),
+    ]
+    futures = [_get_fetch_pool().submit(api.fetch_data) for api in apis]
+    marine_data, wind_data = [future.result() for future in futures]
+    return marine_data, wind_data
+
+# most coordinates put in one multi-location request, longer lists are split into several
+MULTI_LOCATION_CHUNK = 50
+
+def fetch_marine_and_wind_many(coords_list, start_date, end_date, chunk_size=MULTI_LOCATION_CHUNK):
+    # marine and wind for many coordinates with a multi-location request per endpoint per chunk,
+    # all in flight together. returns a (marine_df, wind_df) pair per coords, in order
+    coords_list = list(coords_list)
+    chunks = [coords_list[i:i + chunk_size] for i in range(0, len(coords_list), chunk_size)]
+    futures = [(_get_fetch_pool().submit(OpenMeteoMarineAPI.fetch_many, chunk, start_date, end_date),
+                _get_fetch_pool().submit(OpenMeteoWindAPI.fetch_many, chunk, start_date, end_date))
+               for chunk in chunks]
+    pairs = []
+    for marine_future, wind_future in futures:
+        pairs.extend(zip(marine_future.result(), wind_future.result()))
+    return pairs
+
+@metrics.timed('forecast.by_name')
+def get_surf_forecast_by_name(location_name, coords=None):
+    # fetches the 7-day surf forecast for a given location.
+    # pass already resolved coords to skip the geocoding lookup
+    coords = coords or geocode_location(location_name)
+    if not coords:
+        return pd.DataFrame()
+
+    start_date_str, end_date_str = _forecast_dates()
+    marine_data, wind_data = fetch_marine_and_wind(coords['latitude'], coords['longitude'], start_date_str, end_date_str)
+
+    if not marine_data.empty and not wind_data.empty:
+        with metrics.span('forecast.merge'):
+            combined_df = pd.merge(marine_data, wind_data, on='time', how='inner')
+        return combined_df
+    else:
+        return pd.DataFrame()
+
+@metrics.timed('forecast.assemble')
+def assemble_forecast(location_name, coords=None, refresh=False):
+    # one-stop forecast for the app: geocodes once (unless coords are given) and fetches marine
+    # and wind concurrently. returns {'coords', 'forecast'}, or None when the location can't be
+    # geocoded. the frame keeps the marine sea level, get_scored_forecast finds the tide events
+    # in it, so there is no separate tide request. refresh skips cached marine and wind responses
+    coords = coords or geocode_location(location_name)
+    if not coords:
+        return None
+
+    start_date_str, end_date_str = _forecast_dates()
+    marine_data, wind_data = fetch_marine_and_wind(coords['latitude'], coords['longitude'], start_date_str,
+                                                 end_date_str, refresh)
+
+    forecast_df = pd.DataFrame()
+    if not marine_data.empty and not wind_data.empty:
+        with metrics.span('forecast.merge'):
+            forecast_df = pd.merge(marine_data, wind_data, on='time', how='inner')
+
+    return {
+        'coords': coords,
+        'forecast': forecast_df,
+    }
@@ -0,0 +1,355 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import bcrypt
+
+from . import metrics
+
+DB_PATH_ROOT = os.path.join('db', 'user_data.db')
+
+# bcrypt work factor for new hashes. stored hashes with a different cost are
+# transparently rehashed the next time their owner logs in
+BCRYPT_ROUNDS = 12
+
+# login attempt limiting: this many failures per username or ip within the window
+# blocks further attempts until the window has passed
+MAX_FAILED_LOGINS = 5
+FAILED_LOGIN_WINDOW = 60
+# most usernames/ips tracked at once, least recently failed ones are dropped beyond this
+MAX_TRACKED_LOGIN_KEYS = 10000
+
+# statements are kept as constants so sqlite's per-connection statement cache reuses them
+CREATE_USERS_SQL = '''
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        hashed_password TEXT
+    )
+'''
+INSERT_USER_SQL = "INSERT INTO users (username, hashed_password) VALUES (?, ?)"
+SELECT_HASH_SQL = "SELECT hashed_password FROM users WHERE username = ?"
+UPDATE_HASH_SQL = "UPDATE users SET hashed_password = ? WHERE username = ?"
+DELETE_USER_SQL = "DELETE FROM users WHERE username = ?"
+
+
+# --- connection pool ---
+
+class ConnectionPool:
+    # thread-safe pool of sqlite connections in wal mode.
+    # wal lets readers carry on while one writer commits, and busy_timeout makes a
+    # writer wait for the lock instead of failing with "database is locked"
+    def __init__(self, db_path, size=8, busy_timeout=5.0):
+        self._db_path = db_path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self._db_path, timeout=self.busy_timeout,
+                               check_same_thread=False, cached_statements=64)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        # safe with wal: a crash can lose the last commit but never corrupts the file
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def _acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"no free database connection after {self.busy_timeout}s (pool size {self.size})")
+
+    @contextmanager
+    def connection(self):
+        # borrow a connection, commit on success and roll back on error
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                conn.close()
+            self._all = []
+
+
+# --- password hashing ---
+
+class HashingBusyError(RuntimeError):
+    # raised when the hashing queue is full
+    pass
+
+
+class HashingPool:
+    # runs bcrypt on a small bounded worker pool so a burst of logins can only ever
+    # occupy `workers` cores, and stops queueing once `max_pending` jobs are waiting
+    def __init__(self, workers=2, max_pending=32, latency_window=512):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kookpy-bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusyError("too many password hashes queued, try again shortly")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._timed, func, *args)
+            return future.result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._completed += 1
+                self._latencies.append(elapsed)
+            metrics.observe('auth.bcrypt', elapsed)
+
+    def hashpw(self, password, rounds=BCRYPT_ROUNDS):
+        return self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)))
+
+    def checkpw(self, password, hashed_password):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed_password)
+
+    @property
+    def stats(self):
+        # queue_depth is jobs waiting for a worker, latency is time spent inside bcrypt
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self._in_flight
+            stats = {'completed': self._completed, 'rejected': self._rejected}
+        stats['in_flight'] = in_flight
+        stats['queue_depth'] = max(0, in_flight - self.workers)
+        stats['hash_latency_avg_ms'] = sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+        stats['hash_latency_p95_ms'] = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class LoginRateLimiter:
+    # sliding window count of failed logins per username and per ip.
+    # checked before bcrypt runs, so a flood of bad passwords costs almost nothing.
+    # keys are swept once per window and capped at max_keys, so a flood of distinct
+    # usernames can't grow the table without bound
+    def __init__(self, max_failures=MAX_FAILED_LOGINS, window=FAILED_LOGIN_WINDOW, max_keys=MAX_TRACKED_LOGIN_KEYS):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = OrderedDict()
+        self._next_sweep = time.monotonic() + window
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(username, client_ip=None):
+        keys = [('user', username)]
+        if client_ip:
+            keys.append(('ip', client_ip))
+        return keys
+
+    def _prune(self, key, now):
+        attempts = self._failures.get(key)
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if attempts is not None and not attempts:
+            del self._failures[key]
+
+    def _sweep(self, now):
+        # drops every key whose failures have all aged out
+        for key in list(self._failures):
+            self._prune(key, now)
+        self._next_sweep = now + self.window
+
+    def __len__(self):
+        with self._lock:
+            return len(self._failures)
+
+    def is_blocked(self, username, client_ip=None):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(username, client_ip):
+                self._prune(key, now)
+                if len(self._failures.get(key, ())) >= self.max_failures:
+                    return True
+        return False
+
+    def record_failure(self, username, client_ip=None):
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            for key in self._keys(username, client_ip):
+                self._failures.setdefault(key, deque()).append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def record_success(self, username):
+        # a good login clears the username's failures (the ip keeps its count)
+        with self._lock:
+            self._failures.pop(('user', username), None)
+
+
+def hash_rounds(hashed_password):
+    # work factor stored in a bcrypt hash, e.g. b"$2b$12$..." -> 12
+    try:
+        return int(hashed_password.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+# --- database class (encapsulation & crud) ---
+
+class UserDatabase:
+    # handles secure user auth and db ops
+    def __init__(self, db_path=DB_PATH_ROOT, pool_size=8, busy_timeout=5.0,
+                 bcrypt_rounds=BCRYPT_ROUNDS, hash_workers=2, max_pending_hashes=32, rate_limiter=None):
+        self._db_path = db_path
+        # the db file isn't shipped, it's created (with the users table) on first use
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._pool = ConnectionPool(db_path, size=pool_size, busy_timeout=busy_timeout)
+        self.bcrypt_rounds = bcrypt_rounds
+        self._hasher = HashingPool(workers=hash_workers, max_pending=max_pending_hashes)
+        self.rate_limiter = rate_limiter or LoginRateLimiter()
+        self._initialize_db()
+
+    @property # encapsulation: getter for the db path
+    def db_path(self):
+        return self._db_path
+
+    @property
+    def hash_metrics(self):
+        # queue depth and latency of the bcrypt worker pool
+        return self._hasher.stats
+
+    def _initialize_db(self):
+        # creates the users table if it doesn't exist
+        with self._pool.connection() as conn:
+            conn.execute(CREATE_USERS_SQL)
+
+    @metrics.timed('auth.add_user')
+    def add_user(self, username, password):
+        # securely adds a new user with a hashed password (CREATE)
+        hashed = self._hasher.hashpw(password, self.bcrypt_rounds)
+
+        try:
+            with self._pool.connection() as conn:
+                conn.execute(INSERT_USER_SQL, (username, hashed.decode('utf-8')))
+            return True
+        except sqlite3.IntegrityError:
+            print(f"user {username} already exists.")
+            return False
+
+    def is_rate_limited(self, username, client_ip=None):
+        # true while this username or ip has too many recent failed logins
+        return self.rate_limiter.is_blocked(username, client_ip)
+
+    @metrics.timed('auth.verify_user')
+    def verify_user(self, username, password, client_ip=None):
+        # verifies a user's password against the stored hash (READ).
+        # rejected without hashing while the username/ip is rate limited
+        if self.rate_limiter.is_blocked(username, client_ip):
+            print(f"too many failed logins for {username}, rejecting attempt.")
+            return False
+
+        with self._pool.connection() as conn:
+            result = conn.execute(SELECT_HASH_SQL, (username,)).fetchone()
+
+        verified = False
+        if result:
+            hashed_password = result[0].encode('utf-8')
+            verified = self._hasher.checkpw(password, hashed_password)
+
+        if not verified:
+            self.rate_limiter.record_failure(username, client_ip)
+            return False
+
+        self.rate_limiter.record_success(username)
+        if hash_rounds(hashed_password) != self.bcrypt_rounds:
+            # work factor changed since this hash was made, upgrade it while we have the password
+            self._rehash(username, password, result[0])
+        return True
+
+    def _rehash(self, username, password, old_hash):
+        # best effort: the login already succeeded, a busy pool or db just leaves the old hash
+        try:
+            new_hashed = self._hasher.hashpw(password, self.bcrypt_rounds)
+            with self._pool.connection() as conn:
+                # only replace the hash we verified, in case the password changed meanwhile
+                conn.execute(UPDATE_HASH_SQL + " AND hashed_password = ?",
+                             (new_hashed.decode('utf-8'), username, old_hash))
+        except (HashingBusyError, sqlite3.Error) as e:
+            print(f"error rehashing password for {username}, keeping the old hash: {e}")
+
+    @metrics.timed('auth.modify_user')
+    def modify_user(self, username, new_password):
+        # securely updates a user's password (UPDATE/MODIFY)
+        new_hashed = self._hasher.hashpw(new_password, self.bcrypt_rounds)
+
+        with self._pool.connection() as conn:
+            # rowcount is the rows changed by this statement, not the connection's running total
+            rows_affected = conn.execute(UPDATE_HASH_SQL, (new_hashed.decode('utf-8'), username)).rowcount
+        return rows_affected > 0
+
+    @metrics.timed('auth.delete_user')
+    def delete_user(self, username):
+        # deletes a user account from the database (DELETE)
+        with self._pool.connection() as conn:
+            rows_affected = conn.execute(DELETE_USER_SQL, (username,)).rowcount
+        return rows_affected > 0
+
+    def close(self):
+        # closes every pooled connection and the hashing pool. the object can't be used afterwards
+        self._pool.close()
+        self._hasher.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
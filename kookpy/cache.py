@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH_ROOT = os.path.join('db', 'api_cache.db')
+
+# how long a cached response stays fresh, in seconds. roughly the update cadence of each
+# upstream: the wave and weather models refresh every few hours, the archive barely changes
+ENDPOINT_TTLS = {
+    'marine': 3 * 60 * 60,
+    'weather': 60 * 60,
+    'archive': 24 * 60 * 60,
+    'geocoding': 30 * 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+# 2 decimals is ~1km, plenty for a beach
+COORD_PRECISION = 2
+
+
+class ResponseCache:
+    # persistent ttl cache for open-meteo json responses, stored in a local sqlite file.
+    # entries are evicted least recently used first once max_entries is exceeded
+    def __init__(self, path=CACHE_PATH_ROOT, max_entries=5000, endpoint_ttls=None,
+                 default_ttl=DEFAULT_TTL, coord_precision=COORD_PRECISION):
+        self._path = path
+        self.max_entries = max_entries
+        self.endpoint_ttls = dict(ENDPOINT_TTLS)
+        self.endpoint_ttls.update(endpoint_ttls or {})
+        self.default_ttl = default_ttl
+        self.coord_precision = coord_precision
+
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                payload TEXT,
+                expires_at REAL,
+                last_access REAL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._conn.commit()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = len(self)
+        return stats
+
+    def make_key(self, endpoint, url, params):
+        # endpoint + url + rounded lat/lon + sorted hourly variables + the rest of the params
+        normalized = {}
+        for name, value in (params or {}).items():
+            if name in ('latitude', 'longitude') and isinstance(value, str) and ',' in value:
+                # multi-location requests pass comma separated coordinates
+                value = [round(float(part), self.coord_precision) for part in value.split(',')]
+            elif name in ('latitude', 'longitude'):
+                value = round(float(value), self.coord_precision)
+            elif name == 'hourly':
+                value = ','.join(sorted(str(value).split(',')))
+            normalized[name] = value
+        return json.dumps([endpoint, url, normalized], sort_keys=True)
+
+    def ttl_for(self, endpoint):
+        return self.endpoint_ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key):
+        # returns the cached json payload, or None on a miss or an expired entry
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            payload, expires_at = row
+            if expires_at <= now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                self._stats['misses'] += 1
+                self._stats['expired'] += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self._stats['hits'] += 1
+        return json.loads(payload)
+
+    def set(self, key, endpoint, payload, ttl=None):
+        now = time.time()
+        ttl = self.ttl_for(endpoint) if ttl is None else ttl
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, payload, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, endpoint, json.dumps(payload), now + ttl, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # drop the least recently used rows beyond max_entries (caller holds the lock)
+        count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)',
+                (overflow,))
+            self._stats['evictions'] += overflow
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
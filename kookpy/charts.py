@@ -0,0 +1,181 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from .forecast_cache import get_chart_cache
+from . import metrics
+from .tides import HIGH, LOW, find_tide_extrema
+
+# the 7-day forecast chart as a plain plotly spec (dict / json), built in one pass over
+# the forecast arrays. the app renders it with go.Figure(spec), and the serialized json
+# is cached per (forecast key, beach, resolution) so a forecast is only charted once per
+# process no matter how many sessions look at it.
+#
+# resolution of the wind and tide lines:
+#   '1h'     every hourly point
+#   '3h'     every third hour (the wave bars are always 3-hourly)
+#   'minmax' the lowest and highest point of each 3-hour bucket, two thirds of the points
+#            of '1h' (112 of 168 over a week) but peaks and troughs stay where they are
+RESOLUTIONS = ('1h', '3h', 'minmax')
+DEFAULT_RESOLUTION = '1h'
+BUCKET_HOURS = 3
+
+FEET_PER_METER = 3.281
+
+# retro theme, the app imports these for its css too
+BG_DARK = "#0E1117"
+TEXT_LIGHT = "#e0d8ff"        # lavender
+GRADIENT_LIGHT = "#B8A2F2"    # brighter lavender
+GRADIENT_DARK = "#8A5AD0"     # brighter deep purple
+BUTTON_BG = "#312A45"         # dark button background
+GRID_LINE_COLOR = "#1f2333"   # greyish dividing lines
+FONT = "VT323, monospace"
+SCORE_COLORSCALE = [[0, '#AA55AA'], [0.5, '#5555FF'], [1, '#11CCCC']]
+
+# three stacked rows sharing the bottom x axis, the geometry make_subplots gives for
+# rows=3, vertical_spacing=0.1
+ROW_DOMAINS = ([0.7333333333333334, 1.0], [0.3666666666666667, 0.6333333333333333], [0.0, 0.26666666666666666])
+ROW_AXES = (('x', 'y'), ('x2', 'y2'), ('x3', 'y3'))
+
+
+def _times(values):
+    # datetime64 -> iso minute strings, what plotly.js reads as dates
+    return np.datetime_as_string(np.asarray(values, dtype='datetime64[m]'), unit='m').tolist()
+
+
+def _numbers(values, decimals=3):
+    # rounded floats, with NaN as null so the json stays valid for the browser
+    values = np.round(np.asarray(values, dtype=float), decimals)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def downsample(times, values, resolution=DEFAULT_RESOLUTION, bucket_hours=BUCKET_HOURS):
+    # indices of the points kept for a line trace at `resolution`
+    times = np.asarray(times, dtype='datetime64[h]')
+    n = len(times)
+    if resolution == '1h' or n == 0:
+        return np.arange(n)
+    hours = times.astype(np.int64)
+    if resolution == '3h':
+        return np.flatnonzero(hours % bucket_hours == 0)
+    if resolution == 'minmax':
+        values = np.asarray(values, dtype=float)
+        finite = np.isfinite(values)
+        buckets = hours // bucket_hours
+        # sorted by bucket then value, so each bucket's first index is its min and last its max.
+        # missing values sort past the real ones either way, so they're only kept for a bucket
+        # with nothing else (where they leave a gap in the line)
+        by_min = np.lexsort((np.where(finite, values, np.inf), buckets))
+        by_max = np.lexsort((np.where(finite, values, -np.inf), buckets))
+        sorted_buckets = buckets[by_min]
+        firsts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        lasts = np.r_[firsts[1:] - 1, n - 1]
+        return np.unique(np.concatenate([by_min[firsts], by_max[lasts]]))
+    raise ValueError(f"unknown chart resolution '{resolution}', choose from {RESOLUTIONS}")
+
+
+def _day_markers(times):
+    # dashed divider on all three rows at every midnight, plus a date label per full day
+    days = np.unique(np.asarray(times, dtype='datetime64[D]'))
+    day_strings = np.datetime_as_string(days, unit='D').tolist()
+    line = dict(width=1, dash='dash', color=GRADIENT_DARK)
+    shapes = [dict(type='line', x0=day, x1=day, xref=xref, y0=0, y1=1, yref=f"{yref} domain",
+                   line=line, opacity=0.5)
+              for day in day_strings for xref, yref in ROW_AXES]
+    noons = np.datetime_as_string(days[:-1] + np.timedelta64(12, 'h'), unit='m').tolist()
+    labels = pd.to_datetime(days[:-1]).strftime('%b %d').tolist()
+    annotations = [dict(x=noon, y=-1.05, text=label, xref='x', yref='paper',
+                        font=dict(color=TEXT_LIGHT, size=16, family=FONT))
+                   for noon, label in zip(noons, labels)]
+    return shapes, annotations
+
+
+@metrics.timed('chart.build')
+def build_forecast_figure_spec(forecast_df, beach_name, resolution=DEFAULT_RESOLUTION, tide_events=None):
+    # three-row chart: wave height coloured by score, wind and tide. returns a plotly figure dict.
+    # tide_events (from kookpy.tides) are found from the frame when not given
+    times = forecast_df['time'].to_numpy(dtype='datetime64[ns]')
+    time_strings = np.array(_times(times), dtype=object)
+    if 'swell_wave_height_ft' in forecast_df:
+        wave_ft = forecast_df['swell_wave_height_ft'].to_numpy(dtype=float)
+    else:
+        wave_ft = forecast_df['swell_wave_height'].to_numpy(dtype=float) * FEET_PER_METER
+    scores = forecast_df['wave_quality_score'].to_numpy(dtype=float)
+    wind = forecast_df['wind_speed_10m'].to_numpy(dtype=float)
+    tide = forecast_df['sea_level_height_msl'].to_numpy(dtype=float)
+
+    bars = downsample(times, wave_ft, '3h')
+    wind_points = downsample(times, wind, resolution)
+    tide_points = downsample(times, tide, resolution)
+    # turning points come from the full hourly series so the markers don't move with resolution
+    if tide_events is None:
+        tide_events = find_tide_extrema(times, tide)
+    highs = tide_events[tide_events['kind'] == HIGH]
+    lows = tide_events[tide_events['kind'] == LOW]
+
+    data = [
+        dict(type='bar', x=time_strings[bars].tolist(), y=_numbers(wave_ft[bars]),
+             marker=dict(color=_numbers(scores[bars]), colorscale=SCORE_COLORSCALE, cmin=1, cmax=10),
+             hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>wave height: %{y:.2f} ft<br>quality score: %{marker.color:.1f}<extra></extra>",
+             name="wave height", showlegend=False, xaxis='x', yaxis='y'),
+        dict(type='scatter', x=time_strings[wind_points].tolist(), y=_numbers(wind[wind_points]), mode='lines',
+             name='wind speed (km/h)', line=dict(color=GRADIENT_DARK, dash='dot'),
+             hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>wind speed: %{y:.2f} km/h<extra></extra>",
+             xaxis='x2', yaxis='y2'),
+        dict(type='scatter', x=time_strings[tide_points].tolist(), y=_numbers(tide[tide_points]), mode='lines',
+             name='sea level height', line=dict(color=GRADIENT_LIGHT),
+             hovertemplate="<b>%{x|%b %d, %I:%M %p}</b><br>tide: %{y:.2f} m<extra></extra>",
+             xaxis='x3', yaxis='y3'),
+        dict(type='scatter', x=_times(highs['time']), y=_numbers(highs['height']), mode='markers',
+             name='high tide', marker=dict(symbol='triangle-up', size=10, color=GRADIENT_DARK),
+             hovertemplate="<b>high tide</b><br>date: %{x|%b %d, %I:%M %p}</b><br>height: %{y:.2f} m<extra></extra>",
+             xaxis='x3', yaxis='y3'),
+        dict(type='scatter', x=_times(lows['time']), y=_numbers(lows['height']), mode='markers',
+             name='low tide', marker=dict(symbol='triangle-down', size=10, color=GRADIENT_LIGHT),
+             hovertemplate="<b>low tide</b><br>date: %{x|%b %d, %I:%M %p}</b><br>height: %{y:.2f} m<extra></extra>",
+             xaxis='x3', yaxis='y3'),
+    ]
+
+    shapes, day_labels = _day_markers(times)
+    titles = (f"swell wave height and predicted quality for {beach_name}", "wind speed forecast", "tide forecast")
+    title_annotations = [dict(text=title, x=0.5, xanchor='center', xref='paper', y=domain[1], yanchor='bottom',
+                              yref='paper', showarrow=False, font=dict(size=16))
+                         for title, domain in zip(titles, ROW_DOMAINS)]
+
+    title_font = dict(family=FONT)
+    layout = dict(
+        xaxis=dict(anchor='y', domain=[0.0, 1.0], matches='x3', showticklabels=False, gridcolor=GRID_LINE_COLOR),
+        yaxis=dict(anchor='x', domain=ROW_DOMAINS[0], gridcolor=GRID_LINE_COLOR,
+                   title=dict(text="swell wave height (ft)", font=title_font)),
+        xaxis2=dict(anchor='y2', domain=[0.0, 1.0], matches='x3', showticklabels=False),
+        yaxis2=dict(anchor='x2', domain=ROW_DOMAINS[1], title=dict(text="wind speed (km/h)", font=title_font)),
+        xaxis3=dict(anchor='y3', domain=[0.0, 1.0], title=dict(text="date and time", font=title_font)),
+        yaxis3=dict(anchor='x3', domain=ROW_DOMAINS[2], title=dict(text="sea level (m)", font=title_font)),
+        annotations=title_annotations + day_labels,
+        shapes=shapes,
+        hovermode="x unified",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family=FONT, color=TEXT_LIGHT),
+        margin=dict(b=100),
+        height=1000,
+        title=dict(text=titles[0]),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    return {'data': data, 'layout': layout}
+
+
+def get_forecast_figure_json(forecast, beach_name, resolution=DEFAULT_RESOLUTION, cache=None):
+    # the serialized chart for a get_scored_forecast() result, built once per
+    # (forecast key, beach, resolution) and shared by every session in the process
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"unknown chart resolution '{resolution}', choose from {RESOLUTIONS}")
+    cache = get_chart_cache() if cache is None else cache
+    key = tuple(forecast['key']) + (beach_name, resolution)
+    spec_json = cache.get(key)
+    if spec_json is None:
+        spec = build_forecast_figure_spec(forecast['forecast'], beach_name, resolution, forecast.get('tide_events'))
+        spec_json = json.dumps(spec, separators=(',', ':'))
+        cache.put(key, spec_json)
+    return spec_json
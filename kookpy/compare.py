@@ -0,0 +1,78 @@
+import pandas as pd
+
+from . import metrics
+from .api import _forecast_dates, _get_fetch_pool, fetch_marine_and_wind_many, geocode_location
+from .model import predict_surf_quality_batch
+
+# side-by-side forecasts for many spots: geocode them all, fetch marine and wind with one
+# multi-location request per endpoint, score the whole long frame with one model call and
+# rank each spot's best window. twenty spots cost about what one forecast used to
+DEFAULT_WINDOW_HOURS = 3
+
+# averaged over the window in the ranking table
+WINDOW_COLUMNS = ['wave_quality_score', 'swell_wave_height', 'swell_wave_period', 'wind_speed_10m']
+
+
+@metrics.timed('forecast.many')
+def get_surf_forecasts(locations, window_hours=DEFAULT_WINDOW_HOURS, coords=None):
+    # 7-day forecasts for a list of location names. `coords` maps names to already known
+    # coords to skip geocoding them. returns {'forecast': one long frame with a 'spot' column
+    # and scores, 'best_windows': the ranking table, 'missing': names with no forecast}
+    names = list(dict.fromkeys(locations))
+    coords = dict(coords or {})
+    pending = [name for name in names if name not in coords]
+    for name, found in zip(pending, _get_fetch_pool().map(geocode_location, pending)):
+        if found:
+            coords[name] = found
+    located = [name for name in names if name in coords]
+
+    start_date_str, end_date_str = _forecast_dates()
+    pairs = fetch_marine_and_wind_many([coords[name] for name in located], start_date_str, end_date_str)
+
+    fetched = [(name, marine_data, wind_data) for name, (marine_data, wind_data) in zip(located, pairs)
+               if not marine_data.empty and not wind_data.empty]
+    if not fetched:
+        return {'forecast': pd.DataFrame(), 'best_windows': pd.DataFrame(), 'missing': names}
+
+    # stack each endpoint's frames into one long frame and join them once, not once per spot
+    spots = [name for name, _, _ in fetched]
+    with metrics.span('forecast.merge'):
+        marine_df = pd.concat([marine_data for _, marine_data, _ in fetched], keys=spots, names=['spot', None])
+        wind_df = pd.concat([wind_data for _, _, wind_data in fetched], keys=spots, names=['spot', None])
+        forecast_df = pd.merge(marine_df.reset_index(level='spot'), wind_df.reset_index(level='spot'),
+                               on=['spot', 'time'], how='inner', sort=False).reset_index(drop=True)
+
+    forecast_df['wave_quality_score'] = predict_surf_quality_batch(forecast_df)
+    forecasted = set(forecast_df['spot'])
+    return {
+        'forecast': forecast_df,
+        'best_windows': rank_best_windows(forecast_df, window_hours),
+        'missing': [name for name in names if name not in forecasted],
+    }
+
+
+def rank_best_windows(forecast_df, window_hours=DEFAULT_WINDOW_HOURS, now=None):
+    # each spot's best `window_hours` stretch from now on (highest mean score), best spot first.
+    # columns: rank, spot, window_start, window_end and the window means of WINDOW_COLUMNS
+    now = pd.Timestamp.now().floor('h') if now is None else pd.Timestamp(now)
+    df = forecast_df[forecast_df['time'] >= now].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame()
+
+    # rolling means within each spot, labelled by the window's last hour
+    means = (df.groupby('spot', sort=False)[WINDOW_COLUMNS]
+             .rolling(window_hours, min_periods=window_hours).mean()
+             .reset_index(level=0, drop=True).sort_index())
+    scores = means['wave_quality_score'].dropna()
+    if scores.empty:
+        return pd.DataFrame()
+    best_ends = scores.groupby(df.loc[scores.index, 'spot'], sort=False).idxmax()
+
+    table = means.loc[best_ends.to_numpy()].reset_index(drop=True)
+    table.insert(0, 'spot', best_ends.index.to_numpy())
+    table.insert(1, 'window_start', df['time'].to_numpy()[best_ends.to_numpy() - (window_hours - 1)])
+    table.insert(2, 'window_end', df['time'].to_numpy()[best_ends.to_numpy()] + pd.Timedelta(hours=1))
+    table['swell_wave_height_ft'] = table['swell_wave_height'] * 3.281
+    table = table.sort_values('wave_quality_score', ascending=False, kind='stable').reset_index(drop=True)
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table
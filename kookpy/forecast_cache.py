@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+from . import forecast_store
+from .api import assemble_forecast
+from .gazetteer import normalize_name
+from .model import current_model_version, predict_surf_quality_batch
+from .tides import find_tide_extrema
+
+# in-process memo of scored forecasts, shared by every streamlit session in the process.
+# a result is keyed by (beach, model version, freshness): freshness is the precomputed
+# forecast's timestamp when there is one, otherwise the current live window. so a
+# newly promoted model or a fresh precompute produces a new key, and the old entry ages out
+LIVE_WINDOW = 15 * 60
+MAX_ENTRIES = 256
+
+
+class ForecastCache:
+    # bounded lru of scored forecast results with explicit invalidation
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, beach=None):
+        # drops every entry for one beach, or everything. returns the number removed
+        with self._lock:
+            if beach is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                name = normalize_name(beach)
+                keys = [key for key in self._entries if key[0] == name]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self._stats['invalidations'] += 1
+            return removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+_cache = ForecastCache()
+# serialized charts for those forecasts (kookpy.charts), keyed by forecast key + (beach, resolution)
+_chart_cache = ForecastCache()
+
+
+def get_forecast_cache():
+    return _cache
+
+
+def get_chart_cache():
+    return _chart_cache
+
+
+def forecast_key(beach, now=None):
+    # (beach, model version, freshness) for the forecast the app would show right now
+    computed_at = forecast_store.get_precomputed_computed_at(beach)
+    if computed_at is not None:
+        freshness = f"precomputed:{computed_at}"
+    else:
+        now = time.time() if now is None else now
+        freshness = f"live:{int(now // LIVE_WINDOW)}"
+    return normalize_name(beach), current_model_version(), freshness
+
+
+def get_scored_forecast(beach, cache=None, refresh=False):
+    # the app's forecast: precomputed or live, with quality scores from the serving model.
+    # returns {'coords', 'forecast', 'tide_events', 'key'} or None when the beach can't be geocoded.
+    # refresh skips the memo, the precomputed store and the response cache and fetches upstream.
+    # the returned frame is shared between sessions, callers must copy before changing it
+    cache = _cache if cache is None else cache
+    key = forecast_key(beach)
+    result = None if refresh else cache.get(key)
+    if result is not None:
+        return result
+
+    forecast = None
+    if key[2].startswith('precomputed:') and not refresh:
+        forecast = forecast_store.get_precomputed_forecast(beach)
+    if forecast is None:
+        forecast = assemble_forecast(beach, refresh=refresh)
+    if not forecast:
+        return None
+
+    forecast_df = forecast['forecast']
+    # precomputed scores are kept when the serving model made them, anything else is scored here
+    scored = forecast.get('model_version') == key[1] and 'wave_quality_score' in forecast_df \
+        and forecast_df['wave_quality_score'].notna().all()
+    if not forecast_df.empty and not scored:
+        forecast_df['wave_quality_score'] = predict_surf_quality_batch(forecast_df)
+    # turning points found once per forecast, the tide card and the chart's high/low markers both read them
+    tide_events = find_tide_extrema(forecast_df['time'], forecast_df['sea_level_height_msl']) \
+        if not forecast_df.empty else None
+    result = {'coords': forecast['coords'], 'forecast': forecast_df, 'tide_events': tide_events, 'key': key}
+    if not forecast_df.empty:
+        # failed fetches aren't cached, the next rerun tries again
+        cache.put(key, result)
+    return result
+
+
+def invalidate_forecast(beach=None):
+    # forget cached results and their charts for a beach (or all). the upstream responses stay
+    # cached, pair it with get_scored_forecast(beach, refresh=True) to fetch again
+    _chart_cache.invalidate(beach)
+    return _cache.invalidate(beach)
@@ -0,0 +1,131 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from .gazetteer import normalize_name
+
+FORECAST_STORE_PATH_ROOT = os.path.join('db', 'forecast_store.db')
+
+# precomputed forecasts older than this are ignored and the app fetches live instead
+DEFAULT_MAX_AGE = 3 * 60 * 60
+
+
+class ForecastStore:
+    # local sqlite store of ready-to-render forecasts (frame with predicted scores and the
+    # model version that scored it), written by the precompute scheduler and read by the app
+    def __init__(self, path=FORECAST_STORE_PATH_ROOT):
+        self._path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS forecasts (
+                beach TEXT PRIMARY KEY,
+                computed_at REAL,
+                coords TEXT,
+                forecast TEXT,
+                model_version TEXT
+            )
+        ''')
+        # stores made before scores were versioned
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(forecasts)')]
+        if 'model_version' not in columns:
+            self._conn.execute('ALTER TABLE forecasts ADD COLUMN model_version TEXT')
+        self._conn.commit()
+
+    @property
+    def path(self):
+        return self._path
+
+    def put(self, beach, coords, forecast_df, model_version=None, computed_at=None):
+        computed_at = time.time() if computed_at is None else computed_at
+        payload = forecast_df.to_json(orient='split', date_format='iso', index=False)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO forecasts (beach, computed_at, coords, forecast, model_version) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (normalize_name(beach), computed_at, json.dumps(coords), payload, model_version))
+            self._conn.commit()
+
+    def get(self, beach, max_age=DEFAULT_MAX_AGE):
+        # returns {'coords', 'forecast', 'model_version', 'computed_at'} or None if missing or stale
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT computed_at, coords, forecast, model_version FROM forecasts WHERE beach = ?',
+                (normalize_name(beach),)).fetchone()
+        if row is None:
+            return None
+
+        computed_at, coords, payload, model_version = row
+        if max_age is not None and time.time() - computed_at > max_age:
+            return None
+
+        split = json.loads(payload)
+        forecast_df = pd.DataFrame(split['data'], columns=split['columns'])
+        if 'time' in forecast_df.columns:
+            forecast_df['time'] = pd.to_datetime(forecast_df['time'])
+        return {
+            'coords': json.loads(coords),
+            'forecast': forecast_df,
+            'model_version': model_version,
+            'computed_at': computed_at,
+        }
+
+    def computed_at(self, beach, max_age=DEFAULT_MAX_AGE):
+        # timestamp of the stored forecast without decoding it, or None if missing or stale
+        with self._lock:
+            row = self._conn.execute('SELECT computed_at FROM forecasts WHERE beach = ?',
+                                     (normalize_name(beach),)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        return row[0]
+
+    def beaches(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT beach FROM forecasts ORDER BY beach')]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_forecast_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ForecastStore()
+    return _default_store
+
+
+def get_precomputed_computed_at(beach, max_age=DEFAULT_MAX_AGE):
+    # cheap freshness check: when the precomputed forecast for a beach was made, or None
+    if not os.path.exists(FORECAST_STORE_PATH_ROOT):
+        return None
+    try:
+        return get_forecast_store().computed_at(beach, max_age=max_age)
+    except Exception as e:
+        print(f"error reading precomputed forecast for {beach}: {e}")
+        return None
+
+
+def get_precomputed_forecast(beach, max_age=DEFAULT_MAX_AGE):
+    # fresh precomputed forecast for a beach, or None so the caller falls back to a live fetch
+    if not os.path.exists(FORECAST_STORE_PATH_ROOT):
+        return None
+    try:
+        return get_forecast_store().get(beach, max_age=max_age)
+    except Exception as e:
+        print(f"error reading precomputed forecast for {beach}: {e}")
+        return None
@@ -0,0 +1,78 @@
+import json
+import os
+from functools import lru_cache
+
+# prebuilt name -> coords lookup so the popular beaches never wait on the geocoder
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.json')
+
+# curated beach list shown in the app's "select from list" tab
+CALIFORNIA_BEACHES = [
+    "huntington beach", "malibu", "montara state beach",
+    "steamer lane", "newport beach", "pacifica state beach",
+    "zuma beach", "venice beach", "manhattan beach", "hermosa beach",
+    "redondo beach", "torrance beach", "cabrillo beach", "dana point", "san onofre",
+    "swami's", "ponto beach", "oceanside harbor", "black's beach",
+    "del mar", "encinitas", "solana beach", "mission beach", "ocean beach",
+    "sunset cliffs", "imperial beach", "fort point",
+    "half moon bay", "bolinas", "stinson beach",
+    "cowell's beach", "seabright beach", "manresa state beach",
+    "moss landing", "marina state beach", "carmel beach", "asilomar state beach",
+    "pismo beach", "avila beach", "cayucos", "cambria",
+    "point conception", "jalama beach", "refugio state beach", "el capitan state beach",
+    "gaviota state park", "summerland", "leadbetter beach",
+    "leo carrillo state park", "el matador state beach", "topanga state beach",
+    "surfrider beach", "county line", "zuma", "oxnard shores", "ventura point",
+    "rincon point", "pismo state beach", "grover beach", "santa monica state beach",
+    "dockweiler beach", "san clemente pier",
+    "doheny state beach", "salt creek", "strands beach", "thalia street",
+    "brook street", "main beach, laguna", "table rock beach", "aliso beach",
+    "seal beach", "belmont shore", "long beach",
+    "morro strand state beach", "sunset beach", "bolsa chica state beach",
+    "san elijo state beach"
+]
+
+
+def normalize_name(location_name):
+    # case and whitespace insensitive key for lookups
+    return ' '.join(str(location_name).lower().split())
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path=GAZETTEER_PATH):
+    # loads the bundled gazetteer, an empty dict if it's missing
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {normalize_name(name): coords for name, coords in json.load(f).items()}
+
+
+def lookup_location(location_name):
+    # returns {'latitude', 'longitude'} for a known beach, otherwise None
+    coords = load_gazetteer().get(normalize_name(location_name))
+    return dict(coords) if coords else None
+
+
+def build_gazetteer(names=CALIFORNIA_BEACHES, path=GAZETTEER_PATH):
+    # re-resolves every name with the live geocoder and rewrites the gazetteer file.
+    # names the geocoder can't find keep their existing entry
+    from .api import geocode_location
+
+    gazetteer = dict(load_gazetteer(path))
+    for name in names:
+        coords = geocode_location(name, use_gazetteer=False)
+        if coords:
+            gazetteer[normalize_name(name)] = coords
+        else:
+            print(f"could not geocode {name}, keeping the existing entry.")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(gazetteer, f, indent=2)
+        f.write('\n')
+    load_gazetteer.cache_clear()
+    print(f"wrote {len(gazetteer)} locations to {path}")
+    return gazetteer
+
+
+if __name__ == '__main__':
+    # python -m kookpy.gazetteer rebuilds the file from the geocoding api
+    build_gazetteer()
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+
+# how long the first request of a batch waits for others to join it when others are
+# already queued behind it, in seconds, and the most rows one model call will take
+MAX_WAIT = 0.002
+MAX_BATCH_ROWS = 4096
+
+
+class BatchingPredictor:
+    # coalesces prediction requests from concurrent callers (streamlit sessions, precompute
+    # workers) into one model call per batch. the first request opens a batch, anything
+    # arriving within max_wait joins it, and each caller gets back just its own rows.
+    # a request with nothing queued behind it runs straight away
+    def __init__(self, predict_fn, max_wait=MAX_WAIT, max_batch_rows=MAX_BATCH_ROWS, latency_window=1024):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait
+        self.max_batch_rows = max_batch_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'batches': 0, 'rows': 0, 'max_batch_requests': 0, 'errors': 0}
+        self._queue_latencies = deque(maxlen=latency_window)
+        self._model_latencies = deque(maxlen=latency_window)
+        self._thread = threading.Thread(target=self._run, name='kookpy-inference', daemon=True)
+        self._thread.start()
+
+    def submit(self, features_df):
+        # queues a frame of features, returns a future resolving to a 1d array of scores
+        future = Future()
+        self._queue.put((features_df, future, time.perf_counter()))
+        return future
+
+    def predict(self, features_df):
+        return self.submit(features_df).result()
+
+    def _collect(self):
+        # blocks for the first request, then gathers more until the window closes or the batch is full
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        rows = len(first[0])
+        if self._queue.empty():
+            # uncontended, waiting out the window would only add latency
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            frames = [features_df for features_df, _, _ in batch]
+            try:
+                scores = np.asarray(self.predict_fn(pd.concat(frames, ignore_index=True) if len(frames) > 1
+                                                    else frames[0]))
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for features_df, future, _ in batch:
+                future.set_result(scores[offset:offset + len(features_df)])
+                offset += len(features_df)
+
+            with self._lock:
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['rows'] += offset
+                self._stats['max_batch_requests'] = max(self._stats['max_batch_requests'], len(batch))
+                self._queue_latencies.extend(started - enqueued_at for _, _, enqueued_at in batch)
+                self._model_latencies.append(finished - started)
+            for _, _, enqueued_at in batch:
+                metrics.observe('inference.queue_wait', started - enqueued_at)
+
+    @property
+    def stats(self):
+        # batch sizes, time requests spent queued before their batch ran, and model call time
+        with self._lock:
+            stats = dict(self._stats)
+            queue_latencies = sorted(self._queue_latencies)
+            model_latencies = list(self._model_latencies)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_requests'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        stats['avg_batch_rows'] = stats['rows'] / stats['batches'] if stats['batches'] else 0.0
+        stats['queue_latency_avg_ms'] = sum(queue_latencies) / len(queue_latencies) * 1000 if queue_latencies else 0.0
+        stats['queue_latency_p95_ms'] = \
+            queue_latencies[int(0.95 * (len(queue_latencies) - 1))] * 1000 if queue_latencies else 0.0
+        stats['model_latency_avg_ms'] = sum(model_latencies) / len(model_latencies) * 1000 if model_latencies else 0.0
+        return stats
+
+    def close(self):
+        # lets queued requests finish, then stops the worker
+        self._queue.put(None)
+        self._thread.join()
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_batching_predictor():
+    # the process-wide predictor in front of the model, created on first use
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                from .model import _predict_scores
+                _predictor = BatchingPredictor(_predict_scores)
+    return _predictor
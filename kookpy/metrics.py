@@ -0,0 +1,231 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# per-stage timing for kookpy: span()/timed() record durations into one histogram per
+# stage, exported as prometheus text or json. off by default, and while off a timed
+# call costs one attribute check, so the instrumentation can stay in the hot paths.
+#
+#   KOOKPY_METRICS=1 streamlit run app/app.py
+#   KOOKPY_METRICS=1 KOOKPY_METRICS_PORT=9108 streamlit run app/app.py   # + /metrics endpoint
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_NAME = 'kookpy_stage_seconds'
+
+
+class Histogram:
+    # fixed-bucket histogram of durations
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def quantile(self, q, counts, count):
+        # upper bound of the bucket holding the q-th observation
+        if not count:
+            return 0.0
+        rank = q * count
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            if running >= rank:
+                return bound
+        return self._max
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._sum, self._max
+        cumulative = []
+        running = 0
+        for bucket_count in counts[:-1]:
+            running += bucket_count
+            cumulative.append(running)
+        return {
+            'count': count,
+            'sum_s': total,
+            'avg_ms': total / count * 1000 if count else 0.0,
+            'p50_ms': self.quantile(0.5, counts, count) * 1000,
+            'p95_ms': self.quantile(0.95, counts, count) * 1000,
+            'max_ms': maximum * 1000,
+            'buckets': dict(zip((str(bound) for bound in self.buckets), cumulative)),
+        }
+
+
+class _Span:
+    __slots__ = ('_registry', '_name', '_start')
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # failed calls are timed too, the time was still spent
+        self._registry.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class MetricsRegistry:
+    # named histograms plus the span/decorator helpers that feed them
+    def __init__(self, enabled=False, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).observe(seconds)
+
+    def span(self, name):
+        # `with span('api.marine'): ...` times the block
+        return _Span(self, name) if self.enabled else _NOOP_SPAN
+
+    def timed(self, name):
+        # decorator timing every call of a function under `name`
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histogram(name).observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        # {stage: {count, sum_s, avg_ms, p50_ms, p95_ms, max_ms, buckets}}
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histograms[name].snapshot() for name in sorted(histograms)}
+
+    def to_json(self):
+        return json.dumps({'enabled': self.enabled, 'stages': self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        # prometheus text exposition format, one histogram series per stage label
+        lines = [f"# HELP {METRIC_NAME} time spent per kookpy stage",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for name, snapshot in self.snapshot().items():
+            for bound, count in snapshot['buckets'].items():
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="+Inf"}} {snapshot["count"]}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {snapshot["sum_s"]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {snapshot["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+# process-wide registry used by the instrumented kookpy functions
+registry = MetricsRegistry(enabled=os.environ.get('KOOKPY_METRICS', '').lower() in ('1', 'true', 'yes'))
+
+span = registry.span
+timed = registry.timed
+observe = registry.observe
+snapshot = registry.snapshot
+to_json = registry.to_json
+to_prometheus = registry.to_prometheus
+reset = registry.reset
+
+
+def enable():
+    registry.enabled = True
+
+
+def disable():
+    registry.enabled = False
+
+
+def dump_json(path):
+    with open(path, 'w') as f:
+        f.write(registry.to_json())
+
+
+_http_server = None
+_http_server_lock = threading.Lock()
+
+
+def start_http_server(port=None, host='127.0.0.1'):
+    # serves /metrics (prometheus text) and /metrics.json from a daemon thread. only one
+    # server per process, later calls return the running one. the port defaults to
+    # KOOKPY_METRICS_PORT, and without either nothing is started (returns None)
+    global _http_server
+    port = port if port is not None else os.environ.get('KOOKPY_METRICS_PORT')
+    if port is None:
+        return None
+
+    with _http_server_lock:
+        if _http_server is not None:
+            return _http_server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        _http_server = ThreadingHTTPServer((host, int(port)), Handler)
+        _http_server.daemon_threads = True
+        threading.Thread(target=_http_server.serve_forever, name='kookpy-metrics', daemon=True).start()
+    return _http_server
@@ -0,0 +1,164 @@
+import joblib
+import os
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+from . import metrics
+from .inference import get_batching_predictor
+
+MODEL_PATH_ROOT = os.path.join('ai', 'wave_prediction_model.keras')
+SCALER_X_PATH_ROOT = os.path.join('ai', 'scaler_X.pkl')
+SCALER_Y_PATH_ROOT = os.path.join('ai', 'scaler_y.pkl')
+NUMPY_MODEL_PATH_ROOT = os.path.join('ai', 'wave_prediction_model.npz')
+
+FEATURES = ['swell_wave_height', 'swell_wave_period', 'wind_speed_10m', 'sea_level_height_msl']
+
+
+# --- model/scaler utilities ---
+@lru_cache(maxsize=None)
+def load_model(path=MODEL_PATH_ROOT):
+    # load the pre-trained tensorflow model.
+    # tensorflow is imported here so the numpy serving path never pays for it
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"model file not found at {path}. please run model_trainer.py first.")
+    import tensorflow as tf
+    # use compile=False to avoid model loading issues on different tensorflow versions
+    return tf.keras.models.load_model(path, compile=False)
+
+@lru_cache(maxsize=None)
+def load_scalers():
+    # load the data scalers from disk
+    if not os.path.exists(SCALER_X_PATH_ROOT) or not os.path.exists(SCALER_Y_PATH_ROOT):
+        raise FileNotFoundError("scaler files not found. please run model_trainer.py first.")
+    scaler_X = joblib.load(SCALER_X_PATH_ROOT)
+    scaler_y = joblib.load(SCALER_Y_PATH_ROOT)
+    return scaler_X, scaler_y
+
+
+class NumpyWaveModel:
+    # runs the exported dense network with plain numpy so serving doesn't need tensorflow
+    _activations = {
+        'relu': lambda x: np.maximum(x, 0.0),
+        'linear': lambda x: x,
+    }
+
+    def __init__(self, kernels, biases, activations, x_mean, x_scale, y_mean, y_scale):
+        self.kernels = [np.asarray(k, dtype=np.float64) for k in kernels]
+        self.biases = [np.asarray(b, dtype=np.float64) for b in biases]
+        for activation in activations:
+            if activation not in self._activations:
+                raise ValueError(f"unsupported activation '{activation}' in exported model")
+        self.activations = list(activations)
+        self.x_mean = np.asarray(x_mean, dtype=np.float64)
+        self.x_scale = np.asarray(x_scale, dtype=np.float64)
+        self.y_mean = np.asarray(y_mean, dtype=np.float64)
+        self.y_scale = np.asarray(y_scale, dtype=np.float64)
+
+    @classmethod
+    def from_npz(cls, path=NUMPY_MODEL_PATH_ROOT):
+        # load the artifact written by ai/model_exporter.py
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"numpy model file not found at {path}. please run model_exporter.py first.")
+        with np.load(path) as data:
+            activations = [str(a) for a in data['activations']]
+            kernels = [data[f'kernel_{i}'] for i in range(len(activations))]
+            biases = [data[f'bias_{i}'] for i in range(len(activations))]
+            return cls(kernels, biases, activations,
+                       data['x_mean'], data['x_scale'], data['y_mean'], data['y_scale'])
+
+    def predict_scaled(self, x_scaled):
+        # forward pass on already scaled features
+        out = np.asarray(x_scaled, dtype=np.float64)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            out = self._activations[activation](out @ kernel + bias)
+        return out
+
+    def predict(self, x):
+        # scales raw features, runs the network and returns unscaled scores as a 1d array
+        x_scaled = (np.asarray(x, dtype=np.float64) - self.x_mean) / self.x_scale
+        return (self.predict_scaled(x_scaled) * self.y_scale + self.y_mean)[:, 0]
+
+
+@lru_cache(maxsize=None)
+def load_numpy_model(path=NUMPY_MODEL_PATH_ROOT):
+    # load the tensorflow-free copy of the model
+    return NumpyWaveModel.from_npz(path)
+
+
+def _registry_model():
+    # (version, model) from the model registry's watcher, or (None, None) when nothing is published.
+    # imported here because the registry itself builds on NumpyWaveModel
+    from .registry import get_model_watcher
+    watcher = get_model_watcher()
+    return watcher.active if watcher is not None else (None, None)
+
+
+def current_model_version():
+    # the registry version being served, or 'local' for the flat files under ai/
+    version, model = _registry_model()
+    return version if model is not None else 'local'
+
+
+@metrics.timed('model.forward')
+def _predict_scores(features_df):
+    # prefers the registry's current version, then the flat numpy export, then keras
+    _, registry_model = _registry_model()
+    if registry_model is not None:
+        return registry_model.predict(features_df.to_numpy())
+
+    if os.path.exists(NUMPY_MODEL_PATH_ROOT):
+        return load_numpy_model().predict(features_df.to_numpy())
+
+    model = load_model()
+    scaler_X, scaler_y = load_scalers()
+
+    new_data_scaled = scaler_X.transform(features_df)
+    predicted_scaled = model.predict_on_batch(new_data_scaled)
+    return scaler_y.inverse_transform(np.asarray(predicted_scaled).reshape(-1, 1))[:, 0]
+
+
+
+@metrics.timed('model.predict_batch')
+def predict_surf_quality_batch(df):
+    # predicts the surf quality score for every row of a dataframe in one model call.
+    # returns a series aligned to df.index, rows with missing features are left as nan
+    scores = pd.Series(np.nan, index=df.index, dtype='float64')
+
+    missing = [feature for feature in FEATURES if feature not in df.columns]
+    if missing:
+        print(f"error: missing feature columns {missing}. required features are {FEATURES}")
+        return scores
+
+    features_df = df[FEATURES].apply(pd.to_numeric, errors='coerce')
+    valid = features_df.notna().all(axis=1).to_numpy()
+    if not valid.any():
+        return scores
+
+    # scale and predict the whole frame at once instead of once per row. concurrent callers
+    # share model calls through the batching predictor
+    scores.iloc[valid] = get_batching_predictor().predict(features_df[valid])
+    return scores
+
+
+@metrics.timed('model.predict_row')
+def predict_surf_quality(data_point):
+    # predicts the surf quality score using the trained tensorflow model.
+    # passing a whole dataframe switches to the batched path and returns a series
+    if isinstance(data_point, pd.DataFrame):
+        return predict_surf_quality_batch(data_point)
+
+    features = FEATURES
+
+    try:
+        new_data_df = pd.DataFrame([data_point[features].values], columns=features)
+
+        predicted_score = get_batching_predictor().predict(new_data_df)
+
+        return float(predicted_score[0])
+    except KeyError as e:
+        print(f"error: missing feature in data point: {e}. required features are {features}")
+        return None
+    except Exception as e:
+        print(f"error during prediction: {e}")
+        return None
@@ -0,0 +1,77 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .api import BaseWeatherAPI, assemble_forecast
+from .forecast_store import ForecastStore
+from .gazetteer import CALIFORNIA_BEACHES
+from .model import current_model_version, predict_surf_quality_batch
+
+# refresh every 30 minutes by default, well inside the store's max age
+DEFAULT_INTERVAL = 30 * 60
+DEFAULT_WORKERS = 4
+
+
+def precompute_forecast(beach, store):
+    # fetches, predicts and stores the forecast for one beach. returns True on success
+    forecast = assemble_forecast(beach)
+    if not forecast or forecast['forecast'].empty:
+        print(f"could not fetch forecast for {beach}. skipping.")
+        return False
+
+    forecast_df = forecast['forecast']
+    # read before scoring, so a model promoted mid-run is never stamped on older scores
+    model_version = current_model_version()
+    forecast_df['wave_quality_score'] = predict_surf_quality_batch(forecast_df)
+    store.put(beach, forecast['coords'], forecast_df, model_version)
+    return True
+
+
+def run_once(store, beaches=CALIFORNIA_BEACHES, workers=DEFAULT_WORKERS):
+    # refreshes every beach once, at most `workers` beaches at a time
+    start = time.perf_counter()
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kookpy-precompute') as pool:
+        futures = {pool.submit(precompute_forecast, beach, store): beach for beach in beaches}
+        for future in as_completed(futures):
+            try:
+                refreshed += bool(future.result())
+            except Exception as e:
+                print(f"error precomputing forecast for {futures[future]}: {e}")
+    print(f"refreshed {refreshed}/{len(beaches)} forecasts in {time.perf_counter() - start:.1f}s")
+    return refreshed
+
+
+def run_forever(store, beaches=CALIFORNIA_BEACHES, workers=DEFAULT_WORKERS, interval=DEFAULT_INTERVAL):
+    # refresh loop. each round starts `interval` seconds after the previous one started
+    while True:
+        started = time.monotonic()
+        run_once(store, beaches, workers)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="precompute forecasts for the curated beach list")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="seconds between refreshes")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="beaches refreshed in parallel")
+    parser.add_argument('--max-upstream', type=int, default=None,
+                        help="max open-meteo requests in flight (default: 2 x workers)")
+    parser.add_argument('--beaches', nargs='*', default=None, help="beaches to refresh (default: curated list)")
+    parser.add_argument('--once', action='store_true', help="refresh once and exit")
+    args = parser.parse_args(argv)
+
+    # each beach makes a marine and a wind call, cap the total in flight
+    BaseWeatherAPI.configure_session(max_concurrency=args.max_upstream or 2 * args.workers)
+    # every round fetches fresh data, the app's response cache would mostly hand back the last one
+    BaseWeatherAPI.configure_cache(enabled=False)
+
+    store = ForecastStore()
+    beaches = args.beaches or CALIFORNIA_BEACHES
+    if args.once:
+        run_once(store, beaches, args.workers)
+    else:
+        run_forever(store, beaches, args.workers, args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from .model import NumpyWaveModel
+
+# versioned model sets written by the trainer:
+#   ai/models/v0001/{wave_prediction_model.keras, scaler_X.pkl, scaler_y.pkl,
+#                    wave_prediction_model.npz, manifest.json}
+#   ai/models/CURRENT  <- name of the version the app serves
+# a version directory is complete before it gets its final name, and CURRENT is
+# replaced with a rename, so a reader never sees a half-written or mismatched set
+REGISTRY_ROOT = os.path.join('ai', 'models')
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+NUMPY_MODEL_FILE = 'wave_prediction_model.npz'
+
+# how often the app checks CURRENT for a newly promoted version, in seconds
+WATCH_INTERVAL = 30
+
+
+class RegistryError(RuntimeError):
+    # raised for a missing version or one whose files don't match its manifest
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    # publishes, verifies and loads versioned model sets under one root directory
+    def __init__(self, root=REGISTRY_ROOT):
+        self._root = root
+
+    @property
+    def root(self):
+        return self._root
+
+    def versions(self):
+        if not os.path.isdir(self._root):
+            return []
+        return sorted(name for name in os.listdir(self._root)
+                      if name.startswith('v') and os.path.exists(os.path.join(self._root, name, MANIFEST_FILE)))
+
+    def version_path(self, version):
+        return os.path.join(self._root, version)
+
+    def current_version(self):
+        # the served version, or None if nothing has been published yet
+        try:
+            with open(os.path.join(self._root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_current(self, version):
+        # atomically points CURRENT at an existing version (also how a rollback is done)
+        if version not in self.versions():
+            raise RegistryError(f"model version {version} not found in {self._root}")
+        tmp_path = os.path.join(self._root, f"{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self._root, CURRENT_FILE))
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_path(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def publish(self, files, metrics=None, promote=True):
+        # copies {name: source path} into a new version with a checksummed manifest.
+        # the set is staged under a temporary name and renamed into place once complete.
+        # returns the new version name
+        os.makedirs(self._root, exist_ok=True)
+        staging = os.path.join(self._root, f".staging-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        try:
+            for name, source in files.items():
+                shutil.copyfile(source, os.path.join(staging, name))
+            manifest = {
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'files': {name: file_sha256(os.path.join(staging, name)) for name in files},
+                'metrics': metrics or {},
+            }
+
+            while True:
+                existing = self.versions()
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+                manifest['version'] = version
+                with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+                try:
+                    # fails if another publisher took this number first, then try the next one
+                    os.rename(staging, self.version_path(version))
+                    break
+                except OSError:
+                    if not os.path.exists(self.version_path(version)):
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if promote:
+            self.set_current(version)
+        print(f"published model version {version} to {self._root}")
+        return version
+
+    def verify(self, version):
+        # raises RegistryError unless every file in the manifest is present and unchanged
+        path = self.version_path(version)
+        if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            raise RegistryError(f"model version {version} not found in {self._root}")
+        for name, checksum in self.manifest(version)['files'].items():
+            file_path = os.path.join(path, name)
+            if not os.path.exists(file_path) or file_sha256(file_path) != checksum:
+                raise RegistryError(f"model version {version}: {name} is missing or doesn't match its checksum")
+
+    def load(self, version=None):
+        # verified numpy serving model for a version (default: current)
+        version = version or self.current_version()
+        if version is None:
+            raise RegistryError(f"no model version has been published to {self._root}")
+        self.verify(version)
+        return NumpyWaveModel.from_npz(os.path.join(self.version_path(version), NUMPY_MODEL_FILE))
+
+
+class ModelWatcher:
+    # keeps the current model set loaded and swaps in a newly promoted version from a
+    # background thread. the swap is a single reference assignment, so a request in
+    # flight finishes on the model it started with and nothing is ever dropped
+    def __init__(self, registry=None, interval=WATCH_INTERVAL):
+        self.registry = registry or ModelRegistry()
+        self.interval = interval
+        self._active = (None, None)
+        self._rejected = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        return self._active[0]
+
+    @property
+    def model(self):
+        return self._active[1]
+
+    @property
+    def active(self):
+        # (version, model) read together, so callers never pair one version with another's model
+        return self._active
+
+    def check(self):
+        # loads and swaps in CURRENT if it changed. returns True when a new version went live
+        version = self.registry.current_version()
+        if version is None or version == self._active[0] or version in self._rejected:
+            return False
+        try:
+            model = self.registry.load(version)
+        except Exception as e:
+            # keep serving the previous version, and don't retry a broken one every poll
+            print(f"error loading model version {version}, keeping {self._active[0]}: {e}")
+            self._rejected.add(version)
+            return False
+        self._active = (version, model)
+        print(f"serving model version {version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        # first load happens on the calling thread so the caller starts with a model
+        self.check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='kookpy-model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_model_watcher():
+    # the process-wide watcher over the default registry, started on first use.
+    # None while nothing has been published, so callers fall back to the flat ai/ files
+    global _watcher
+    if _watcher is None:
+        if ModelRegistry().current_version() is None:
+            return None
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = ModelWatcher().start()
+    return _watcher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="inspect and manage the model registry")
+    parser.add_argument('--root', default=REGISTRY_ROOT)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="list versions and show the current one")
+    publish = subparsers.add_parser('publish', help="publish the model files in a directory as a new version")
+    publish.add_argument('source', nargs='?', default='ai')
+    rollback = subparsers.add_parser('set-current', help="point CURRENT at an existing version")
+    rollback.add_argument('version')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current_version()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {manifest['created_at']}  {json.dumps(manifest.get('metrics', {}))}")
+    elif args.command == 'publish':
+        from_dir = args.source
+        names = ['wave_prediction_model.keras', 'scaler_X.pkl', 'scaler_y.pkl', NUMPY_MODEL_FILE]
+        registry.publish({name: os.path.join(from_dir, name) for name in names})
+    else:
+        registry.set_current(args.version)
+        print(f"current model version is now {args.version}")
+
+
+if __name__ == '__main__':
+    main()
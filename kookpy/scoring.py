@@ -0,0 +1,53 @@
+import numpy as np
+
+# --- heuristic logic (used for data collection and testing) ---
+
+# forecasting model weights, shared by the scalar and vectorized versions
+HEIGHT_WEIGHT = 0.5
+PERIOD_WEIGHT = 0.4
+WIND_WEIGHT = -0.1
+
+MAX_HEIGHT = 3.0
+MAX_PERIOD = 15.0
+MAX_WIND = 30.0
+
+
+def calculate_heuristic_score(row):
+    # calculates a heuristic wave quality score based on swell and wind data.
+    normalized_height = min(row['swell_wave_height'], MAX_HEIGHT) / MAX_HEIGHT * 10
+    normalized_period = min(row['swell_wave_period'], MAX_PERIOD) / MAX_PERIOD * 10
+    normalized_wind = min(row['wind_speed_10m'], MAX_WIND) / MAX_WIND * 10
+
+    score = (HEIGHT_WEIGHT * normalized_height) + \
+            (PERIOD_WEIGHT * normalized_period) + \
+            (WIND_WEIGHT * normalized_wind)
+
+    # check score bounds
+    score = max(1, min(10, score))
+    return score
+
+
+def calculate_heuristic_score_vectorized(data=None, swell_wave_height=None, swell_wave_period=None, wind_speed_10m=None):
+    # numpy version of calculate_heuristic_score for whole dataframes or column arrays.
+    # pass a dataframe (or dict of columns) as data, or the three columns as keywords.
+    # gives the same scores as the scalar version, rows with nan inputs come back as nan
+    if data is not None:
+        swell_wave_height = data['swell_wave_height']
+        swell_wave_period = data['swell_wave_period']
+        wind_speed_10m = data['wind_speed_10m']
+
+    height = np.asarray(swell_wave_height, dtype=np.float64)
+    period = np.asarray(swell_wave_period, dtype=np.float64)
+    wind = np.asarray(wind_speed_10m, dtype=np.float64)
+
+    # same operation order as the scalar version so the floats match exactly
+    normalized_height = np.minimum(height, MAX_HEIGHT) / MAX_HEIGHT * 10
+    normalized_period = np.minimum(period, MAX_PERIOD) / MAX_PERIOD * 10
+    normalized_wind = np.minimum(wind, MAX_WIND) / MAX_WIND * 10
+
+    score = (HEIGHT_WEIGHT * normalized_height) + \
+            (PERIOD_WEIGHT * normalized_period) + \
+            (WIND_WEIGHT * normalized_wind)
+
+    # check score bounds
+    return np.maximum(1.0, np.minimum(10.0, score))
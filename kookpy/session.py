@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# (connect, read) timeouts in seconds per open-meteo endpoint.
+# archive responses can span months of hourly data so they get a longer read timeout
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    'geocoding': (3.05, 5),
+    'marine': (3.05, 10),
+    'weather': (3.05, 10),
+    'archive': (3.05, 30),
+}
+
+# statuses worth retrying: rate limited or a temporary upstream failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    # thread-safe token bucket: on average `rate` acquisitions per second, bursts up to `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _CountingAdapter(HTTPAdapter):
+    # http adapter whose connection pools report every new tcp connection they open
+    def __init__(self, on_new_connection, **kwargs):
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+class ApiSession:
+    # shared http layer for the open-meteo clients: keep-alive connection pooling,
+    # per-endpoint timeouts and bounded retries with jittered exponential backoff
+    def __init__(self, pool_size=16, endpoint_timeouts=None, default_timeout=DEFAULT_TIMEOUT,
+                 max_retries=3, backoff_factor=0.5, max_backoff=8.0, retry_statuses=RETRY_STATUSES,
+                 max_concurrency=None, rate_limit=None):
+        self.endpoint_timeouts = dict(ENDPOINT_TIMEOUTS)
+        self.endpoint_timeouts.update(endpoint_timeouts or {})
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+
+        # optional cap on requests in flight at once (used by the precompute scheduler)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        # optional global requests-per-second limit (used by the bulk history collector)
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'new_connections': 0, 'failures': 0}
+
+        self._session = requests.Session()
+        # urllib3 retries are off, retrying happens in get() so it can be counted
+        adapter = _CountingAdapter(self._count_new_connection, pool_connections=pool_size,
+                                   pool_maxsize=pool_size, max_retries=0)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _count_new_connection(self):
+        self._count('new_connections')
+
+    @property
+    def stats(self):
+        # snapshot of the counters. reused_connections is requests that didn't need a new connection
+        with self._lock:
+            stats = dict(self._stats)
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        return stats
+
+    def timeout_for(self, endpoint):
+        return self.endpoint_timeouts.get(endpoint, self.default_timeout)
+
+    def _backoff(self, attempt, response=None):
+        # full jitter backoff. honours retry-after on 429/503 if the server sends one
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            delay = min(self.max_backoff, float(response.headers['Retry-After']))
+            time.sleep(delay)
+            return
+        time.sleep(random.uniform(0, delay))
+
+    def get(self, url, params=None, endpoint=None):
+        # get with retries. raises the last requests exception if every attempt fails, and
+        # returns the last response (e.g. a 503) when retries run out so callers can raise_for_status
+        timeout = self.timeout_for(endpoint)
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            try:
+                response = self._send(url, params, timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                self._backoff(attempt)
+                continue
+
+            if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                self._count('retries')
+                response.close()
+                self._backoff(attempt, response)
+                continue
+
+            if response.status_code in self.retry_statuses:
+                self._count('failures')
+            return response
+
+    def _send(self, url, params, timeout):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self._slots is None:
+            return self._session.get(url, params=params, timeout=timeout)
+        with self._slots:
+            return self._session.get(url, params=params, timeout=timeout)
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import numpy as np
+
+from . import metrics
+
+# high and low tides from an hourly sea level series in one numpy pass: turning points are
+# where the sign of the first difference flips, and each one is refined by fitting a
+# parabola through it and its two neighbours, so times land between the hourly samples
+HIGH = 1
+LOW = -1
+
+# one row per high or low tide, oldest first
+TIDE_EVENT_DTYPE = np.dtype([('time', 'datetime64[s]'), ('height', 'f8'), ('kind', 'i1')])
+
+# open-meteo's fill value for missing samples
+MISSING_LEVEL = -999
+
+
+@metrics.timed('tides.extrema')
+def find_tide_extrema(times, levels):
+    # structured array of TIDE_EVENT_DTYPE for the turning points of `levels` sampled at `times`.
+    # missing samples (NaN or -999) are skipped, flat stretches count as one turning point
+    times = np.asarray(times, dtype='datetime64[ns]')
+    levels = np.asarray(levels, dtype=float)
+    valid = np.isfinite(levels) & (levels != MISSING_LEVEL)
+    times, levels = times[valid], levels[valid]
+    if len(levels) < 3:
+        return np.empty(0, dtype=TIDE_EVENT_DTYPE)
+
+    # sign of each step, with flat steps taking the sign of the last real change
+    signs = np.sign(np.diff(levels))
+    nonzero = np.flatnonzero(signs)
+    if len(nonzero) == 0:
+        return np.empty(0, dtype=TIDE_EVENT_DTYPE)
+    fill = np.maximum.accumulate(np.where(signs != 0, np.arange(len(signs)), nonzero[0]))
+    signs = signs[fill]
+
+    # sample i is a turning point when the step into it and the step out of it disagree
+    turns = np.flatnonzero(signs[:-1] != signs[1:]) + 1
+    kinds = np.where(signs[turns - 1] > 0, HIGH, LOW)
+
+    # vertex of the parabola through (i-1, i, i+1), as an offset in samples from i
+    before, at, after = levels[turns - 1], levels[turns], levels[turns + 1]
+    curvature = before - 2 * at + after
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offsets = np.where(curvature != 0, 0.5 * (before - after) / curvature, 0.0)
+    offsets = np.clip(offsets, -0.5, 0.5)
+    heights = at - 0.25 * (before - after) * offsets
+
+    # offsets scale with the spacing on the side they point to
+    steps = np.where(offsets < 0, times[turns] - times[turns - 1], times[turns + 1] - times[turns])
+    event_times = times[turns] + (offsets * steps.astype(np.int64)).astype('timedelta64[ns]')
+
+    events = np.empty(len(turns), dtype=TIDE_EVENT_DTYPE)
+    events['time'] = event_times.astype('datetime64[s]')
+    events['height'] = heights
+    events['kind'] = kinds
+    return events
+
+
+def next_tides(events, now=None):
+    # {'next_high_tide': {'time', 'height_m'}, 'next_low_tide': ...} for the first events after
+    # now, or None when there are none
+    now = np.datetime64(datetime.now() if now is None else now, 's')
+    upcoming = events[events['time'] > now]
+
+    result = {}
+    for kind, label in ((HIGH, 'next_high_tide'), (LOW, 'next_low_tide')):
+        matches = upcoming[upcoming['kind'] == kind]
+        if len(matches):
+            event = matches[0]
+            result[label] = {
+                'time': event['time'].astype(datetime).strftime('%H:%M %p'),
+                'height_m': float(event['height'])
+            }
+    return result if result else None
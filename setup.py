@@ -4,9 +4,9 @@ setup(
     name='kookpy',
     version='1.1.0',
     packages=find_packages(),
+    package_data={'kookpy': ['data/*.json']},
     install_requires=[
         'pandas',
-        'tensorflow',
         'joblib',
         'streamlit',
         'requests',
@@ -14,5 +14,10 @@ setup(
         'plotly',
         'numpy',
         'bcrypt',
+        'pyarrow',
     ],
-)
\ No newline at end of file
+    # the app serves with numpy, tensorflow is only needed to train: pip install -e ".[train]"
+    extras_require={
+        'train': ['tensorflow'],
+    },
+)
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.fake_open_meteo import FakeOpenMeteoServer
+
+# fake values for each hourly variable the clients ask for, replayed as constant series
+FAKE_HOURLY_VALUES = {
+    'swell_wave_height': 1.2,
+    'swell_wave_period': 11.0,
+    'wave_direction': 250,
+    'sea_level_height_msl': 0.3,
+    'wind_speed_10m': 8.0,
+    'wind_direction_10m': 200,
+}
+
+FAKE_HOURLY_PAYLOAD = {'hourly': {variable: [value] for variable, value in FAKE_HOURLY_VALUES.items()}}
+
+FAKE_PAYLOADS = {
+    '/v1/search': {'results': [{'name': 'kook point', 'latitude': 33.54, 'longitude': -117.78}]},
+    '/v1/marine': FAKE_HOURLY_PAYLOAD,
+    '/v1/forecast': FAKE_HOURLY_PAYLOAD,
+    '/v1/archive': FAKE_HOURLY_PAYLOAD,
+}
+
+
+@pytest.fixture
+def fake_open_meteo(monkeypatch, tmp_path):
+    # starts a fake open-meteo server and points every kookpy api url at it
+    import kookpy.api
+    from kookpy.cache import ResponseCache
+    from kookpy.session import ApiSession
+
+    fake = FakeOpenMeteoServer(payloads=FAKE_PAYLOADS).start()
+    # fresh session per test so counters start at zero, with tiny backoff to keep tests fast
+    monkeypatch.setattr(kookpy.api.BaseWeatherAPI, '_session', ApiSession(backoff_factor=0.01))
+    # and an empty response cache in the test's temp dir
+    cache = ResponseCache(path=str(tmp_path / 'api_cache.db'))
+    monkeypatch.setattr(kookpy.api.BaseWeatherAPI, '_cache', cache)
+    monkeypatch.setattr(kookpy.api.BaseWeatherAPI, '_cache_enabled', True)
+    monkeypatch.setattr(kookpy.api, 'GEOCODING_API_URL', f"{fake.url}/v1/search")
+    monkeypatch.setattr(kookpy.api, 'MARINE_API_URL', f"{fake.url}/v1/marine")
+    monkeypatch.setattr(kookpy.api, 'WEATHER_API_URL', f"{fake.url}/v1/forecast")
+    monkeypatch.setattr(kookpy.api, 'HISTORICAL_WEATHER_API_URL', f"{fake.url}/v1/archive")
+    yield fake
+    fake.stop()
+    cache.close()
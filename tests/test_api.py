@@ -0,0 +1,85 @@
+import math
+import time
+
+from benchmarks.fake_open_meteo import restamp
+from conftest import FAKE_HOURLY_PAYLOAD
+
+import kookpy
+
+
+def _tidal_marine_handler(path, query):
+    # marine payload with a ~12.4h semi-diurnal tide so highs and lows exist
+    status, payload = 200, restamp(FAKE_HOURLY_PAYLOAD, query)
+    hours = len(payload['hourly']['time'])
+    payload['hourly']['sea_level_height_msl'] = [
+        round(0.8 * math.sin(2 * math.pi * h / 12.42), 3) for h in range(hours)]
+    return status, payload
+
+
+def test_assemble_forecast_reuses_marine_response_for_tides(fake_open_meteo):
+    fake_open_meteo.handlers['/v1/marine'] = _tidal_marine_handler
+
+    forecast = kookpy.assemble_forecast("kook point")
+
+    assert forecast['coords'] == {'latitude': 33.54, 'longitude': -117.78}
+    assert len(forecast['forecast']) == 7 * 24
+    events = kookpy.find_tide_extrema(forecast['forecast']['time'], forecast['forecast']['sea_level_height_msl'])
+    tides = kookpy.next_tides(events)
+    assert 'next_high_tide' in tides
+    assert 'next_low_tide' in tides
+
+    # one call per upstream, no separate tide request
+    assert fake_open_meteo.count('/v1/search') == 1
+    assert fake_open_meteo.count('/v1/marine') == 1
+    assert fake_open_meteo.count('/v1/forecast') == 1
+
+
+def test_marine_and_wind_are_fetched_concurrently(fake_open_meteo):
+    delay = 0.4
+
+    def slow_handler(path, query):
+        time.sleep(delay)
+        return fake_open_meteo.default_handler(path, query)
+
+    fake_open_meteo.handlers['/v1/marine'] = slow_handler
+    fake_open_meteo.handlers['/v1/forecast'] = slow_handler
+
+    start = time.perf_counter()
+    forecast_df = kookpy.get_surf_forecast_by_name("laguna beach")
+    elapsed = time.perf_counter() - start
+
+    assert not forecast_df.empty
+    # sequential calls would take at least 2 * delay
+    assert elapsed < 2 * delay
+
+
+def test_assemble_forecast_returns_none_for_unknown_location(fake_open_meteo):
+    fake_open_meteo.handlers['/v1/search'] = lambda path, query: (200, {})
+
+    assert kookpy.assemble_forecast("nowhere at all") is None
+
+
+def test_curated_beaches_resolve_from_gazetteer_offline(fake_open_meteo):
+    for beach in kookpy.CALIFORNIA_BEACHES:
+        coords = kookpy.geocode_location(beach)
+        assert 32.0 < coords['latitude'] < 42.0
+        assert -125.0 < coords['longitude'] < -114.0
+
+    assert kookpy.geocode_location("  Huntington   Beach ") == kookpy.geocode_location("huntington beach")
+    assert fake_open_meteo.count('/v1/search') == 0
+
+
+def test_geocoding_results_are_cached(fake_open_meteo):
+    first = kookpy.geocode_location("kook point")
+    second = kookpy.geocode_location("kook point")
+
+    assert first == second
+    assert fake_open_meteo.count('/v1/search') == 1
+
+
+def test_forecast_with_resolved_coords_skips_geocoding(fake_open_meteo):
+    forecast_df = kookpy.get_surf_forecast_by_name(
+        "kook point", coords={'latitude': 33.54, 'longitude': -117.78})
+
+    assert not forecast_df.empty
+    assert fake_open_meteo.count('/v1/search') == 0
@@ -0,0 +1,49 @@
+import json
+
+import requests
+
+from benchmarks.fake_open_meteo import FakeOpenMeteoServer, patched_kookpy
+from benchmarks.run import main
+
+
+def test_fake_server_restamps_recorded_series_to_the_requested_range():
+    with FakeOpenMeteoServer() as server:
+        response = requests.get(f"{server.url}/v1/archive", params={
+            'latitude': 33.5, 'longitude': -117.8, 'hourly': 'wind_speed_10m',
+            'start_date': '2022-03-01', 'end_date': '2022-04-30'})
+
+    hourly = response.json()['hourly']
+    assert hourly['time'][0] == '2022-03-01T00:00'
+    assert hourly['time'][-1] == '2022-04-30T23:00'
+    assert len(hourly['wind_speed_10m']) == 61 * 24
+    # values come from the recording, not a constant
+    assert len(set(hourly['wind_speed_10m'])) > 10
+
+
+def test_patched_kookpy_is_restored_afterwards():
+    import kookpy.api as api
+    original = api.MARINE_API_URL
+
+    with FakeOpenMeteoServer() as server, patched_kookpy(server):
+        assert api.MARINE_API_URL.startswith(server.url)
+    assert api.MARINE_API_URL == original
+
+
+def test_suite_writes_machine_readable_report(tmp_path):
+    output = tmp_path / 'bench.json'
+
+    main(['--stages', 'forecast_cold', 'forecast_warm', 'tides', 'predict_batch',
+          '--repeat', '3', '--output', str(output)])
+
+    report = json.loads(output.read_text())
+    assert report['peak_rss_mb'] > 0
+    assert [result['benchmark'] for result in report['results']] == \
+        ['forecast_cold', 'forecast_warm', 'tides', 'predict_batch']
+    for result in report['results']:
+        assert result['repeat'] == 3
+        assert 0 < result['latency_p50_ms'] <= result['latency_p99_ms']
+        assert result['throughput_per_s'] > 0
+        assert result['peak_traced_mb'] >= 0
+    # cold and tides go upstream on every call (setup + warmup + 3 timed + 1 traced, tides has no setup),
+    # the warm run only misses once and predict_batch fetches its frame once
+    assert report['upstream_requests']['/v1/marine'] == 6 + 1 + 5 + 1
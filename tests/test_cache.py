@@ -0,0 +1,62 @@
+import kookpy
+from kookpy.cache import ResponseCache
+
+
+def test_repeat_forecast_is_served_from_cache(fake_open_meteo):
+    first = kookpy.OpenMeteoMarineAPI(33.541, -117.781, "2023-01-01", "2023-01-02").fetch_data()
+    # slightly different coordinates round to the same ~1km cell
+    second = kookpy.OpenMeteoMarineAPI(33.539, -117.779, "2023-01-01", "2023-01-02").fetch_data()
+
+    assert fake_open_meteo.count('/v1/marine') == 1
+    assert first.equals(second)
+
+    stats = kookpy.BaseWeatherAPI.get_cache().stats
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_different_date_range_or_variables_miss(fake_open_meteo):
+    kookpy.OpenMeteoMarineAPI(33.54, -117.78, "2023-01-01", "2023-01-02").fetch_data()
+    kookpy.OpenMeteoMarineAPI(33.54, -117.78, "2023-01-03", "2023-01-04").fetch_data()
+    kookpy.fetch_tide_data(33.54, -117.78, "2023-01-01", "2023-01-02")
+
+    assert fake_open_meteo.count('/v1/marine') == 3
+
+
+def test_failed_responses_are_not_cached(fake_open_meteo):
+    fake_open_meteo.handlers['/v1/marine'] = lambda path, query: (400, {'error': True, 'reason': 'bad'})
+    kookpy.OpenMeteoMarineAPI(33.54, -117.78, "2023-01-01", "2023-01-02").fetch_data()
+
+    assert len(kookpy.BaseWeatherAPI.get_cache()) == 0
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), endpoint_ttls={'marine': 0})
+    key = cache.make_key('marine', 'http://x', {'latitude': 1, 'longitude': 2})
+    cache.set(key, 'marine', {'hourly': {}})
+
+    assert cache.get(key) is None
+    assert cache.stats['expired'] == 1
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), max_entries=2)
+    cache.set('a', 'marine', {'n': 1})
+    cache.set('b', 'marine', {'n': 2})
+    assert cache.get('a') == {'n': 1}
+
+    cache.set('c', 'marine', {'n': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.get('c') == {'n': 3}
+    assert cache.stats['evictions'] == 1
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(path=path)
+    cache.set('key', 'weather', {'hourly': {'time': []}})
+    cache.close()
+
+    assert ResponseCache(path=path).get('key') == {'hourly': {'time': []}}
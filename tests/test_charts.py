@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kookpy.charts import build_forecast_figure_spec, downsample, get_forecast_figure_json
+from kookpy.forecast_cache import ForecastCache
+
+
+def _forecast_df(hours=48):
+    times = pd.date_range('2024-06-01', periods=hours, freq='h')
+    phase = np.arange(hours) * 2 * np.pi / 12.42
+    return pd.DataFrame({
+        'time': times,
+        'swell_wave_height': np.linspace(0.5, 2.0, hours),
+        'wind_speed_10m': np.abs(np.sin(np.arange(hours) / 5.0)) * 20,
+        'sea_level_height_msl': np.sin(phase),
+        'wave_quality_score': np.linspace(1, 10, hours),
+    })
+
+
+def test_downsample_resolutions():
+    df = _forecast_df(24)
+    times, wind = df['time'], df['wind_speed_10m'].to_numpy()
+
+    assert len(downsample(times, wind, '1h')) == 24
+    assert list(downsample(times, wind, '3h')) == list(range(0, 24, 3))
+
+    kept = downsample(times, wind, 'minmax')
+    for bucket in range(8):
+        values = wind[bucket * 3:bucket * 3 + 3]
+        chosen = wind[[i for i in kept if bucket * 3 <= i < bucket * 3 + 3]]
+        assert chosen.min() == values.min() and chosen.max() == values.max()
+    assert len(kept) <= 16
+
+    with pytest.raises(ValueError):
+        downsample(times, wind, '2h')
+
+
+def test_figure_spec_layout():
+    spec = build_forecast_figure_spec(_forecast_df(72), "kook point", resolution='minmax')
+    bars, wind, tide, highs, lows = spec['data']
+
+    assert len(bars['x']) == 24
+    assert len(wind['x']) < 72
+    assert len(highs['x']) == 6 and len(lows['x']) == 5
+    # one dashed divider per day per row, and a date label between consecutive days
+    assert len(spec['layout']['shapes']) == 3 * 3
+    assert [shape['xref'] for shape in spec['layout']['shapes'][:3]] == ['x', 'x2', 'x3']
+    assert len(spec['layout']['annotations']) == 3 + 2
+
+
+def test_figure_json_is_cached_per_forecast_and_resolution():
+    cache = ForecastCache()
+    forecast = {'forecast': _forecast_df(), 'key': ('kook point', 'local', 'live:1')}
+
+    hourly = get_forecast_figure_json(forecast, "kook point", '1h', cache)
+    assert get_forecast_figure_json(forecast, "kook point", '1h', cache) is hourly
+    bucketed = get_forecast_figure_json(forecast, "kook point", 'minmax', cache)
+
+    assert len(bucketed) < len(hourly)
+    assert json.loads(hourly)['layout']['height'] == 1000
+    assert cache.stats['hits'] == 1
+    assert cache.invalidate("Kook Point") == 2
+
+
+def test_minmax_skips_missing_values():
+    times = pd.date_range('2024-06-01', periods=6, freq='h')
+    values = np.array([np.nan, 4.0, 5.0, np.nan, np.nan, np.nan])
+
+    kept = downsample(times, values, 'minmax')
+    # the real min and max of the first bucket, and gap points for the all-missing one
+    assert [i for i in kept if i < 3] == [1, 2]
+    assert np.isnan(values[[i for i in kept if i >= 3]]).all()
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from kookpy.compare import get_surf_forecasts, rank_best_windows
+
+
+def test_many_spots_share_one_request_per_endpoint(fake_open_meteo):
+    spots = [f"kook point {i}" for i in range(20)]
+
+    result = get_surf_forecasts(spots + ["kook point 0"])
+
+    forecast_df = result['forecast']
+    assert list(forecast_df['spot'].unique()) == spots
+    assert forecast_df['wave_quality_score'].notna().all()
+    assert result['missing'] == []
+    assert fake_open_meteo.count('/v1/marine') == 1
+    assert fake_open_meteo.count('/v1/forecast') == 1
+    assert len(result['best_windows']) == 20
+
+
+def test_repeated_comparison_is_served_from_the_cache(fake_open_meteo):
+    coords = {name: {'latitude': 33.5 + i, 'longitude': -117.8} for i, name in enumerate(['a', 'b', 'c'])}
+
+    first = get_surf_forecasts(list(coords), coords=coords)
+    second = get_surf_forecasts(list(coords), coords=coords)
+
+    assert fake_open_meteo.count('/v1/marine') == 1
+    assert fake_open_meteo.count('/v1/forecast') == 1
+    pd.testing.assert_frame_equal(first['forecast'], second['forecast'])
+
+
+def test_falls_back_to_one_call_per_spot(fake_open_meteo):
+    # an api answering with a single location for several coordinates
+    fake_open_meteo.handlers['/v1/marine'] = lambda path, query: (200, {'hourly': {'time': []}})
+    coords = {'a': {'latitude': 1.0, 'longitude': 2.0}, 'b': {'latitude': 3.0, 'longitude': 4.0}}
+
+    result = get_surf_forecasts(['a', 'b'], coords=coords)
+
+    # one multi-location try, then a call each, all of them empty
+    assert fake_open_meteo.count('/v1/marine') == 3
+    assert result['forecast'].empty
+    assert result['missing'] == ['a', 'b']
+
+
+def test_rank_best_windows():
+    times = pd.date_range('2024-06-01', periods=6, freq='h')
+    forecast_df = pd.DataFrame({
+        'spot': ['a'] * 6 + ['b'] * 6,
+        'time': list(times) * 2,
+        'swell_wave_height': 1.0,
+        'swell_wave_period': 10.0,
+        'wind_speed_10m': 5.0,
+        'wave_quality_score': [1, 2, 3, 9, 9, 9] + [5, 8, 8, 8, 1, 1],
+    })
+
+    table = rank_best_windows(forecast_df, window_hours=3, now=times[0])
+
+    assert list(table['spot']) == ['a', 'b']
+    assert list(table['rank']) == [1, 2]
+    assert table.loc[0, 'window_start'] == times[3]
+    assert table.loc[0, 'window_end'] == times[5] + pd.Timedelta(hours=1)
+    assert table.loc[0, 'wave_quality_score'] == 9
+    assert table.loc[1, 'window_start'] == times[1]
+    # nothing left after now
+    assert rank_best_windows(forecast_df, now=times[-1] + pd.Timedelta(hours=1)).empty
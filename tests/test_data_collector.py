@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pandas as pd
+
+import kookpy
+from ai.data_collector import CollectionManifest, collect_and_save_historical_data, collect_spots, date_windows, main
+from ai.history_store import HistoryStore
+
+
+def test_date_windows_cover_range_without_gaps():
+    windows = list(date_windows(datetime(2023, 1, 1), datetime(2023, 3, 5), window_days=31))
+
+    assert windows[0][0] == datetime(2023, 1, 1)
+    assert windows[-1][1] == datetime(2023, 3, 5)
+    for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+        assert (next_start - previous_end).days == 1
+    assert all((end - start).days < 31 for start, end in windows)
+
+
+def test_collector_requests_one_call_per_window(fake_open_meteo, tmp_path):
+    output_path = tmp_path / 'historical_surf_data.csv'
+
+    full_df = collect_and_save_historical_data(
+        "kook point", "2023-01-01", "2023-12-31", output_path=str(output_path))
+
+    # 12 monthly windows per endpoint instead of 365 daily calls
+    assert fake_open_meteo.count('/v1/marine') == 12
+    assert fake_open_meteo.count('/v1/archive') == 12
+    assert fake_open_meteo.count('/v1/search') == 1
+
+    # every hour of the year made it back into one merged frame
+    saved = pd.read_csv(output_path, parse_dates=['time'])
+    assert len(saved) == len(full_df) == 365 * 24
+    assert saved['time'].is_monotonic_increasing
+    assert saved['time'].is_unique
+    assert {'swell_wave_height', 'wind_speed_10m', 'wave_quality_score'} <= set(saved.columns)
+
+
+def _spot_geocoder(path, query):
+    # a distinct coordinate per spot name so units don't share cached responses
+    latitude = 33.0 + sum(map(ord, query['name'][0])) % 100 / 100
+    return 200, {'results': [{'name': query['name'][0], 'latitude': latitude, 'longitude': -117.78}]}
+
+
+def test_multi_spot_collection_records_manifest_and_resumes(fake_open_meteo, tmp_path, monkeypatch):
+    fake_open_meteo.handlers['/v1/search'] = _spot_geocoder
+    store = HistoryStore(str(tmp_path / 'history'))
+    spots = ["kook point", "kook reef"]
+
+    # the first run loses every marine call for march
+    def flaky_marine(path, query):
+        if query['start_date'][0].startswith('2023-03'):
+            return 500, {'error': True}
+        return fake_open_meteo.default_handler(path, query)
+    fake_open_meteo.handlers['/v1/marine'] = flaky_marine
+
+    summary = collect_spots(spots, "2023-01-01", "2023-03-31", store, workers=3, rate_limit=None)
+
+    assert summary == {'completed': 4, 'skipped': 0, 'failed': 2}
+    manifest = CollectionManifest(str(tmp_path / 'history' / 'manifest.json'))
+    assert manifest.job == {'spots': spots, 'start': "2023-01-01", 'end': "2023-03-31"}
+    assert manifest.is_done("kook reef", "2023-02")
+    assert not manifest.is_done("kook reef", "2023-03")
+
+    assert manifest.is_done("kook reef", "2023-02", "2023-02-01", "2023-02-28")
+    assert not manifest.is_done("kook reef", "2023-02", "2023-02-01", "2023-03-01")
+
+    # resuming from the manifest only fetches the two units that failed, and only
+    # looks into the store for those
+    del fake_open_meteo.handlers['/v1/marine']
+    marine_calls = fake_open_meteo.count('/v1/marine')
+    checked = []
+    original_missing_months = HistoryStore.missing_months
+    def counting_missing_months(self, spot, start_date, end_date):
+        checked.append((spot, str(start_date)[:7]))
+        return original_missing_months(self, spot, start_date, end_date)
+    monkeypatch.setattr(HistoryStore, 'missing_months', counting_missing_months)
+    summary = main(['--resume', '--store', str(tmp_path / 'history'), '--rate', '0'])
+
+    assert summary == {'completed': 2, 'skipped': 4, 'failed': 0}
+    assert sorted(checked) == [("kook point", "2023-03"), ("kook reef", "2023-03")]
+    assert fake_open_meteo.count('/v1/marine') - marine_calls == 2
+    # collector runs keep archive months out of the app's response cache
+    assert kookpy.BaseWeatherAPI.get_cache() is None
+    assert len(CollectionManifest(manifest.path).completed()) == 6
+    assert store.read(['time'], spots=["kook point"])['time'].dt.month.nunique() == 3
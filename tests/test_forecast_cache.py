@@ -0,0 +1,92 @@
+import pytest
+
+import kookpy
+import kookpy.forecast_cache as forecast_cache
+from kookpy.forecast_cache import ForecastCache, forecast_key, get_scored_forecast
+
+
+@pytest.fixture
+def cache(fake_open_meteo, monkeypatch):
+    # no precomputed store, so every key is a live window
+    monkeypatch.setattr(forecast_cache.forecast_store, 'get_precomputed_computed_at', lambda beach: None)
+    return ForecastCache(max_entries=2)
+
+
+def test_reruns_reuse_the_scored_forecast(fake_open_meteo, cache):
+    first = get_scored_forecast("Kook Point", cache)
+    second = get_scored_forecast("kook point ", cache)
+
+    assert second is first
+    assert first['forecast']['wave_quality_score'].notna().all()
+    assert fake_open_meteo.count('/v1/marine') == 1
+    assert cache.stats['hits'] == 1
+
+
+def test_key_changes_with_model_version_and_freshness(cache, monkeypatch):
+    base = forecast_key("kook point", now=0)
+    assert forecast_key("kook point", now=forecast_cache.LIVE_WINDOW - 1) == base
+    assert forecast_key("kook point", now=forecast_cache.LIVE_WINDOW) != base
+
+    monkeypatch.setattr(forecast_cache, 'current_model_version', lambda: 'v0042')
+    assert forecast_key("kook point", now=0)[1] == 'v0042'
+
+    monkeypatch.setattr(forecast_cache.forecast_store, 'get_precomputed_computed_at', lambda beach: 1700000000.0)
+    assert forecast_key("kook point", now=0)[2] == 'precomputed:1700000000.0'
+
+
+def test_new_model_version_recomputes(fake_open_meteo, cache, monkeypatch):
+    get_scored_forecast("kook point", cache)
+    monkeypatch.setattr(forecast_cache, 'current_model_version', lambda: 'v0002')
+    result = get_scored_forecast("kook point", cache)
+
+    assert result['key'][1] == 'v0002'
+    assert cache.stats['misses'] == 2
+
+
+def test_invalidate_and_lru_bound(fake_open_meteo, cache):
+    get_scored_forecast("kook point", cache)
+    get_scored_forecast("kook reef", cache)
+    assert cache.invalidate("KOOK POINT") == 1
+
+    get_scored_forecast("kook point", cache)
+    get_scored_forecast("kook bay", cache)
+    # max_entries=2 evicted the least recently used (kook reef)
+    assert len(cache) == 2
+    assert {key[0] for key in cache._entries} == {"kook point", "kook bay"}
+    assert cache.invalidate() == 2
+
+
+def test_failed_fetch_is_not_cached(fake_open_meteo, cache):
+    fake_open_meteo.handlers['/v1/marine'] = lambda path, query: (400, {'error': True})
+
+    result = get_scored_forecast("kook point", cache)
+
+    assert result['forecast'].empty
+    assert len(cache) == 0
+
+
+def test_precomputed_scores_are_trusted_for_the_serving_model(fake_open_meteo, cache, monkeypatch):
+    stored = kookpy.assemble_forecast("kook point")
+    stored['forecast']['wave_quality_score'] = 7.0
+    monkeypatch.setattr(forecast_cache.forecast_store, 'get_precomputed_computed_at', lambda beach: 1.0)
+    monkeypatch.setattr(forecast_cache.forecast_store, 'get_precomputed_forecast',
+                        lambda beach: dict(stored, forecast=stored['forecast'].copy(), model_version='v0001'))
+    monkeypatch.setattr(forecast_cache, 'current_model_version', lambda: 'v0001')
+
+    assert (get_scored_forecast("kook point", cache)['forecast']['wave_quality_score'] == 7.0).all()
+
+    # scored by an older model, so the serving one scores it again
+    monkeypatch.setattr(forecast_cache, 'current_model_version', lambda: 'v0002')
+    assert (get_scored_forecast("kook point", cache)['forecast']['wave_quality_score'] != 7.0).any()
+
+
+def test_refresh_goes_upstream_again(fake_open_meteo, cache):
+    first = get_scored_forecast("kook point", cache)
+    cache.invalidate("kook point")
+    refreshed = get_scored_forecast("kook point", cache, refresh=True)
+
+    assert refreshed is not first
+    assert fake_open_meteo.count('/v1/marine') == 2
+    assert fake_open_meteo.count('/v1/forecast') == 2
+    # and the fresh result is what later reruns get
+    assert get_scored_forecast("kook point", cache) is refreshed
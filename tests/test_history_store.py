@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai.data_collector import collect_into_store
+from ai.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(root=str(tmp_path / 'history'))
+
+
+def _hourly_frame(start, periods):
+    times = pd.date_range(start, periods=periods, freq='h')
+    return pd.DataFrame({
+        'time': times,
+        'swell_wave_height': np.linspace(0.5, 2.0, periods),
+        'swell_wave_period': 10.0,
+        'wave_direction': 250.0,
+        'sea_level_height_msl': 0.2,
+        'wind_speed_10m': 8.0,
+        'wind_direction_10m': 200.0,
+        'wave_quality_score': 5.0,
+    })
+
+
+def test_append_partitions_by_spot_and_month_with_float32_columns(store):
+    # jan 31 00:00 -> feb 1 23:00 spans two month partitions
+    written = store.append("Main Beach, Laguna", _hourly_frame('2023-01-31', 48))
+
+    assert written == ['2023-01', '2023-02']
+    assert store.spots() == ['main_beach_laguna']
+    df = store.read()
+    assert len(df) == 48
+    assert df['swell_wave_height'].dtype == np.float32
+    assert str(df['time'].dtype).startswith('datetime64')
+
+
+def test_append_merges_into_existing_partition(store):
+    store.append("malibu", _hourly_frame('2023-01-01', 24))
+    store.append("malibu", _hourly_frame('2023-01-01 12:00', 24))
+
+    assert store.months("malibu") == ['2023-01']
+    assert len(store.read()) == 36
+
+
+def test_read_selects_columns_and_spots(store):
+    store.append("malibu", _hourly_frame('2023-01-01', 24))
+    store.append("zuma", _hourly_frame('2023-01-01', 24))
+
+    df = store.read(columns=['swell_wave_height'], spots=["zuma"])
+    assert list(df.columns) == ['swell_wave_height']
+    assert len(df) == 24
+
+
+def test_collector_only_fetches_missing_months(fake_open_meteo, store):
+    assert collect_into_store("kook point", "2023-01-01", "2023-03-31", store) == ['2023-01', '2023-02', '2023-03']
+    assert fake_open_meteo.count('/v1/marine') == 3
+
+    # rerun with one more month: only april is fetched
+    assert collect_into_store("kook point", "2023-01-01", "2023-04-30", store) == ['2023-04']
+    assert fake_open_meteo.count('/v1/marine') == 4
+    assert fake_open_meteo.count('/v1/archive') == 4
+
+    # partially covered month (only up to the 15th) gets topped up
+    collect_into_store("kook point", "2023-05-01", "2023-05-15", store)
+    assert collect_into_store("kook point", "2023-05-01", "2023-05-31", store) == ['2023-05']
+    assert len(store.read(months=['2023-05'])) == 31 * 24
+
+
+def test_trainer_reads_feature_columns_from_store(store, tmp_path):
+    # the trainer needs tensorflow, only installed with the [train] extra
+    pytest.importorskip('tensorflow')
+    from ai.model_trainer import FEATURES, TARGET, load_training_data
+    store.append("malibu", _hourly_frame('2023-01-01', 24))
+
+    df = load_training_data(store=store, csv_path=str(tmp_path / 'missing.csv'))
+
+    assert list(df.columns) == FEATURES + [TARGET]
+    assert len(df) == 24
@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+# importing the package must not pull in the heavy serving/training dependencies
+HEAVY_MODULES = ['tensorflow', 'keras', 'streamlit', 'bcrypt', 'sqlite3', 'requests', 'pandas']
+
+# generous upper bound for `import kookpy` on its own, in seconds
+IMPORT_TIME_BUDGET = 0.5
+
+
+def _run_in_fresh_interpreter(code):
+    # sys.modules has to be clean, so every check runs in its own python process
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_kookpy_is_lazy_and_fast():
+    report = _run_in_fresh_interpreter(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import kookpy\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+
+    assert report['heavy'] == []
+    assert report['elapsed'] < IMPORT_TIME_BUDGET, \
+        f"import kookpy took {report['elapsed']:.3f}s, budget is {IMPORT_TIME_BUDGET}s"
+
+
+def test_scoring_does_not_load_model_or_auth_dependencies():
+    report = _run_in_fresh_interpreter(
+        "import json, sys\n"
+        "import kookpy\n"
+        "kookpy.calculate_heuristic_score\n"
+        "print(json.dumps({'heavy': [m for m in ['tensorflow', 'streamlit', 'bcrypt'] if m in sys.modules]}))\n"
+    )
+
+    assert report['heavy'] == []
+
+
+def test_user_db_is_created_lazily():
+    report = _run_in_fresh_interpreter(
+        "import json, sys\n"
+        "import kookpy\n"
+        "print(json.dumps({'created': 'user_db' in vars(kookpy), 'auth': 'kookpy.auth' in sys.modules}))\n"
+    )
+
+    assert report == {'created': False, 'auth': False}
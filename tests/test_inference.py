@@ -0,0 +1,89 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kookpy.inference import BatchingPredictor
+
+
+def _slow_sum(features_df):
+    # stand-in model: row sums, with a fixed cost per call like a real forward pass
+    time.sleep(0.02)
+    return features_df.to_numpy().sum(axis=1)
+
+
+@pytest.fixture
+def predictor():
+    predictor = BatchingPredictor(_slow_sum, max_wait=0.01)
+    yield predictor
+    predictor.close()
+
+
+def test_concurrent_requests_share_model_calls_and_get_their_own_rows(predictor):
+    results = {}
+    start = threading.Barrier(16)
+
+    def caller(i):
+        frame = pd.DataFrame({'a': [float(i)] * (i + 1), 'b': [1.0] * (i + 1)})
+        start.wait()
+        results[i] = predictor.predict(frame)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(16):
+        np.testing.assert_array_equal(results[i], np.full(i + 1, i + 1.0))
+
+    stats = predictor.stats
+    assert stats['requests'] == 16
+    assert stats['rows'] == sum(range(1, 17))
+    # 16 callers, far fewer model calls
+    assert stats['batches'] <= 4
+    assert stats['max_batch_requests'] >= 4
+    assert stats['avg_batch_requests'] == 16 / stats['batches']
+    assert stats['queue_latency_p95_ms'] > 0
+
+
+def test_batches_are_capped_by_row_count():
+    predictor = BatchingPredictor(_slow_sum, max_wait=0.05, max_batch_rows=10)
+    try:
+        futures = [predictor.submit(pd.DataFrame({'a': [1.0] * 4})) for _ in range(6)]
+        assert all(len(future.result()) == 4 for future in futures)
+        # at most 3 requests (12 rows) fit before a batch closes
+        assert predictor.stats['max_batch_requests'] <= 3
+    finally:
+        predictor.close()
+
+
+def test_model_errors_reach_every_caller_in_the_batch():
+    def broken(features_df):
+        raise ValueError("bad weights")
+
+    predictor = BatchingPredictor(broken, max_wait=0.01)
+    try:
+        futures = [predictor.submit(pd.DataFrame({'a': [1.0]})) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+        assert predictor.stats['errors'] >= 1
+
+        # the worker keeps serving after a failure
+        predictor.predict_fn = _slow_sum
+        np.testing.assert_array_equal(predictor.predict(pd.DataFrame({'a': [2.0]})), [2.0])
+    finally:
+        predictor.close()
+
+
+def test_a_lone_request_does_not_wait_for_the_window():
+    predictor = BatchingPredictor(lambda features_df: features_df.to_numpy().sum(axis=1), max_wait=1.0)
+    try:
+        started = time.perf_counter()
+        np.testing.assert_array_equal(predictor.predict(pd.DataFrame({'a': [1.0, 2.0]})), [1.0, 2.0])
+        assert time.perf_counter() - started < 0.5
+    finally:
+        predictor.close()
@@ -0,0 +1,108 @@
+import json
+import time
+import urllib.request
+
+import pytest
+
+import kookpy
+from kookpy import metrics
+from kookpy.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_span_and_timed_record_histograms():
+    registry = MetricsRegistry(enabled=True)
+
+    @registry.timed('work')
+    def work(seconds):
+        time.sleep(seconds)
+        return 'done'
+
+    assert work(0.002) == 'done'
+    assert work(0.02) == 'done'
+    with registry.span('block'):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span('failing'):
+            raise ValueError("boom")
+
+    stats = registry.snapshot()
+    assert stats['work']['count'] == 2
+    assert 20 <= stats['work']['max_ms'] < 1000
+    assert stats['work']['buckets']['0.001'] == 0
+    assert stats['work']['buckets']['0.025'] == 2
+    assert stats['block']['count'] == 1
+    assert stats['failing']['count'] == 1
+
+
+def test_disabled_registry_records_nothing_and_costs_little():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.timed('noop')
+    def noop():
+        return 1
+
+    def bare():
+        return 1
+
+    calls = 100000
+    start = time.perf_counter()
+    for _ in range(calls):
+        bare()
+    bare_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        noop()
+        with registry.span('noop'):
+            pass
+    timed_time = time.perf_counter() - start
+
+    assert registry.snapshot() == {}
+    # well under a microsecond of overhead per instrumented call
+    assert (timed_time - bare_time) / calls < 2e-6
+
+
+def test_prometheus_and_json_export():
+    registry = MetricsRegistry(enabled=True)
+    registry.observe('api.marine', 0.03)
+    registry.observe('api.marine', 0.2)
+
+    text = registry.to_prometheus()
+    assert '# TYPE kookpy_stage_seconds histogram' in text
+    assert 'kookpy_stage_seconds_bucket{stage="api.marine",le="0.05"} 1' in text
+    assert 'kookpy_stage_seconds_bucket{stage="api.marine",le="+Inf"} 2' in text
+    assert 'kookpy_stage_seconds_count{stage="api.marine"} 2' in text
+
+    exported = json.loads(registry.to_json())
+    assert exported['stages']['api.marine']['count'] == 2
+    assert exported['stages']['api.marine']['p95_ms'] == 250.0
+
+
+def test_forecast_stages_are_instrumented(fake_open_meteo, enabled_metrics):
+    forecast = kookpy.assemble_forecast("kook point")
+    kookpy.predict_surf_quality_batch(forecast['forecast'])
+    kookpy.find_tide_extrema(forecast['forecast']['time'], forecast['forecast']['sea_level_height_msl'])
+
+    stages = enabled_metrics.snapshot()
+    for stage in ('forecast.assemble', 'api.geocode', 'api.marine', 'api.wind', 'upstream.marine',
+                  'upstream.weather', 'forecast.merge', 'tides.extrema', 'model.predict_batch'):
+        assert stages[stage]['count'] >= 1, stage
+
+
+def test_http_endpoint_serves_both_formats(enabled_metrics):
+    enabled_metrics.observe('api.geocode', 0.01)
+    server = metrics.start_http_server(port=0)
+    port = server.server_address[1]
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert 'stage="api.geocode"' in response.read().decode()
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+        assert json.loads(response.read())['stages']['api.geocode']['count'] == 1
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+# the trainer needs tensorflow, only installed with the [train] extra
+pytest.importorskip('tensorflow')
+
+from ai.history_store import HistoryStore
+from ai.model_trainer import (FEATURES, TARGET, fit_scalers_streaming, holdout_mask, iter_chunks,
+                              load_training_state, make_dataset, new_partitions, save_model_and_scalers,
+                              save_training_state, train_in_memory, train_streaming, warm_start)
+
+
+def _synthetic_frame(start, end, seed=0):
+    # hourly rows whose score is linear in the inputs
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, end, freq='h')
+    df = pd.DataFrame({
+        'time': times,
+        'swell_wave_height': rng.uniform(0.2, 3.0, len(times)),
+        'swell_wave_period': rng.uniform(5.0, 18.0, len(times)),
+        'sea_level_height_msl': rng.uniform(-0.5, 1.5, len(times)),
+        'wind_speed_10m': rng.uniform(0.0, 30.0, len(times)),
+    })
+    df[TARGET] = 2 * df['swell_wave_height'] + 0.3 * df['swell_wave_period'] - 0.1 * df['wind_speed_10m']
+    return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    # two spots x two months of hourly rows with a learnable score
+    store = HistoryStore(root=str(tmp_path / 'history'))
+    for seed, spot in enumerate(("kook point", "kook reef")):
+        store.append(spot, _synthetic_frame('2023-01-01', '2023-02-28 23:00', seed))
+    return store
+
+
+@pytest.fixture
+def trained_dir(store, tmp_path):
+    # a model trained on the fixture store, saved with its training state
+    base_dir = tmp_path / 'model'
+    base_dir.mkdir()
+    model, scaler_x, scaler_y, metrics = train_in_memory(store.read(FEATURES + [TARGET]), epochs=5)
+    save_model_and_scalers(model, scaler_x, scaler_y, base_dir=str(base_dir))
+    save_training_state(store, metrics, str(base_dir))
+    return str(base_dir)
+
+
+def test_holdout_split_is_stable_and_roughly_sized():
+    times = pd.date_range('2023-01-01', periods=10000, freq='h')
+
+    mask = holdout_mask(times)
+
+    assert np.array_equal(mask, holdout_mask(times))
+    assert 0.17 < mask.mean() < 0.23
+
+
+def test_streaming_scalers_match_in_memory_fit_on_training_rows(store):
+    partitions = store.partitions()
+    scaler_x, scaler_y = fit_scalers_streaming(store, partitions, chunk_rows=500)
+
+    df = store.read(['time'] + FEATURES + [TARGET])
+    train = df[~holdout_mask(df['time'])]
+    expected_x = StandardScaler().fit(train[FEATURES].to_numpy(dtype=np.float32))
+    expected_y = StandardScaler().fit(train[[TARGET]].to_numpy(dtype=np.float32))
+
+    np.testing.assert_allclose(scaler_x.mean_, expected_x.mean_, rtol=1e-5)
+    np.testing.assert_allclose(scaler_x.scale_, expected_x.scale_, rtol=1e-4)
+    np.testing.assert_allclose(scaler_y.mean_, expected_y.mean_, rtol=1e-5)
+
+    # training and held-out chunks partition the rows exactly
+    train_rows = sum(len(y) for _, y in iter_chunks(store, partitions, False, chunk_rows=500))
+    held_out_rows = sum(len(y) for _, y in iter_chunks(store, partitions, True, chunk_rows=500))
+    assert train_rows == len(train)
+    assert train_rows + held_out_rows == len(df)
+
+
+def test_dataset_yields_scaled_batches(store):
+    partitions = store.partitions()
+    scaler_x, scaler_y = fit_scalers_streaming(store, partitions)
+
+    x_batch, y_batch = next(iter(make_dataset(store, partitions, scaler_x, scaler_y, batch_size=64)))
+
+    assert x_batch.shape == (64, len(FEATURES))
+    assert y_batch.shape == (64, 1)
+    assert abs(float(np.mean(x_batch))) < 1.0
+
+
+def test_train_streaming_learns_and_reports_resources(store):
+    model, scaler_x, scaler_y, metrics = train_streaming(store, epochs=3, batch_size=64, shuffle_buffer=1000)
+
+    assert metrics['mode'] == 'streaming'
+    assert metrics['train_rows'] == int(np.max(scaler_x.n_samples_seen_))
+    assert metrics['train_time_s'] > 0
+    assert metrics['peak_rss_mb'] > 0
+    # the target is linear in the inputs, variance is ~1.6 so this is well below guessing the mean
+    assert metrics['val_mse'] < 0.5
+
+
+def test_train_streaming_without_data_returns_none(tmp_path):
+    assert train_streaming(HistoryStore(root=str(tmp_path / 'empty'))) is None
+
+
+def test_warm_start_fine_tunes_only_new_partitions_and_promotes(store, trained_dir):
+    assert warm_start(store, trained_dir) is None  # nothing new yet
+
+    store.append("kook point", _synthetic_frame('2023-03-01', '2023-03-31 23:00', seed=7))
+    assert [p[:2] for p in new_partitions(store, load_training_state(trained_dir))] == [('kook_point', '2023-03')]
+
+    metrics = warm_start(store, trained_dir, epochs=10)
+
+    assert metrics['new_partitions'] == ['kook_point/2023-03']
+    assert metrics['promoted']
+    assert metrics['val_mse'] <= metrics['val_mse_before']
+    # the promoted run is now the baseline
+    assert new_partitions(store, load_training_state(trained_dir)) == []
+
+
+def test_warm_start_keeps_current_model_when_validation_regresses(store, trained_dir):
+    store.append("kook reef", _synthetic_frame('2023-03-01', '2023-03-31 23:00', seed=8))
+    model_file = f"{trained_dir}/wave_prediction_model.keras"
+    with open(model_file, 'rb') as f:
+        before = f.read()
+
+    # a huge learning rate wrecks the weights, so the result must not be promoted
+    metrics = warm_start(store, trained_dir, epochs=2, patience=5, learning_rate=50.0)
+
+    assert not metrics['promoted']
+    assert metrics['val_mse'] > metrics['val_mse_before']
+    with open(model_file, 'rb') as f:
+        assert f.read() == before
+    assert len(new_partitions(store, load_training_state(trained_dir))) == 1
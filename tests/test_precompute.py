@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+import kookpy
+from kookpy.forecast_store import ForecastStore
+from kookpy.precompute import run_once
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ForecastStore(path=str(tmp_path / 'forecast_store.db'))
+    yield store
+    store.close()
+
+
+def test_run_once_stores_scored_forecasts(fake_open_meteo, store):
+    beaches = ["huntington beach", "malibu", "steamer lane"]
+
+    assert run_once(store, beaches, workers=2) == 3
+
+    assert store.beaches() == sorted(beaches)
+    stored = store.get("Huntington Beach")
+    assert stored['coords'] == kookpy.geocode_location("huntington beach")
+    assert len(stored['forecast']) == 7 * 24
+    assert stored['forecast']['wave_quality_score'].notna().all()
+    assert stored['model_version'] == kookpy.current_model_version()
+    assert str(stored['forecast']['time'].dtype).startswith('datetime64')
+    # one marine + one wind call per beach, no geocoding for curated beaches
+    assert fake_open_meteo.count('/v1/marine') == 3
+    assert fake_open_meteo.count('/v1/search') == 0
+
+
+def test_stale_forecasts_are_ignored(fake_open_meteo, store):
+    run_once(store, ["malibu"], workers=1)
+    stored = store.get("malibu")
+    store.put("malibu", stored['coords'], stored['forecast'],
+              computed_at=time.time() - 10 * 60 * 60)
+
+    assert store.get("malibu") is None
+    assert store.get("malibu", max_age=None) is not None
+
+
+def test_upstream_concurrency_is_bounded(fake_open_meteo, store):
+    in_flight = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def counting_handler(path, query):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        time.sleep(0.05)
+        with lock:
+            in_flight['now'] -= 1
+        return fake_open_meteo.default_handler(path, query)
+
+    fake_open_meteo.handlers['/v1/marine'] = counting_handler
+    fake_open_meteo.handlers['/v1/forecast'] = counting_handler
+    kookpy.BaseWeatherAPI.configure_session(max_concurrency=2, backoff_factor=0.01)
+
+    run_once(store, kookpy.CALIFORNIA_BEACHES[:8], workers=4)
+
+    assert in_flight['max'] <= 2
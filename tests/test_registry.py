@@ -0,0 +1,107 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from kookpy.registry import ModelRegistry, ModelWatcher, RegistryError
+
+MODEL_FILES = ['wave_prediction_model.keras', 'scaler_X.pkl', 'scaler_y.pkl', 'wave_prediction_model.npz']
+
+
+@pytest.fixture
+def registry(tmp_path):
+    if not all(os.path.exists(os.path.join('ai', name)) for name in MODEL_FILES):
+        pytest.skip("model files not found. cannot run registry tests.")
+    return ModelRegistry(str(tmp_path / 'models'))
+
+
+def _publish(registry, promote=True):
+    return registry.publish({name: os.path.join('ai', name) for name in MODEL_FILES},
+                            metrics={'val_mse': 0.1}, promote=promote)
+
+
+def test_publish_creates_checksummed_versions_and_moves_current(registry):
+    assert registry.current_version() is None
+
+    assert _publish(registry) == 'v0001'
+    assert _publish(registry, promote=False) == 'v0002'
+
+    assert registry.versions() == ['v0001', 'v0002']
+    assert registry.current_version() == 'v0001'
+    manifest = registry.manifest('v0002')
+    assert set(manifest['files']) == set(MODEL_FILES)
+    assert manifest['metrics'] == {'val_mse': 0.1}
+    registry.verify('v0002')
+    # no staging directories or temp pointers left behind
+    assert sorted(os.listdir(registry.root)) == ['CURRENT', 'v0001', 'v0002']
+
+    registry.set_current('v0002')
+    assert registry.current_version() == 'v0002'
+    with pytest.raises(RegistryError):
+        registry.set_current('v0099')
+
+
+def test_tampered_version_fails_verification(registry):
+    version = _publish(registry)
+    with open(os.path.join(registry.version_path(version), 'scaler_y.pkl'), 'ab') as f:
+        f.write(b'junk')
+
+    with pytest.raises(RegistryError):
+        registry.load(version)
+
+
+def test_watcher_swaps_in_new_version_and_skips_broken_ones(registry):
+    _publish(registry)
+    watcher = ModelWatcher(registry, interval=3600).start()
+    try:
+        assert watcher.version == 'v0001'
+        assert watcher.check() is False  # unchanged
+
+        _publish(registry)
+        assert watcher.check() is True
+        assert watcher.version == 'v0002'
+
+        # a corrupt version is refused and the previous one keeps serving
+        broken = _publish(registry, promote=False)
+        os.remove(os.path.join(registry.version_path(broken), 'wave_prediction_model.npz'))
+        registry.set_current(broken)
+        assert watcher.check() is False
+        assert watcher.version == 'v0002'
+        assert watcher.model is not None
+    finally:
+        watcher.stop()
+
+
+def test_predictions_keep_working_while_versions_swap(registry):
+    _publish(registry)
+    watcher = ModelWatcher(registry, interval=0.01).start()
+    x = np.array([[1.5, 12.0, 5.0, 0.3]] * 8)
+    errors = []
+    done = threading.Event()
+
+    def predict_forever():
+        while not done.is_set():
+            try:
+                _, model = watcher.active
+                assert model.predict(x).shape == (8,)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=predict_forever)
+    thread.start()
+    try:
+        for _ in range(5):
+            _publish(registry)
+        # give the background thread time to pick up the last one
+        for _ in range(200):
+            if watcher.version == 'v0006':
+                break
+            threading.Event().wait(0.01)
+    finally:
+        done.set()
+        thread.join()
+        watcher.stop()
+
+    assert errors == []
+    assert watcher.version == 'v0006'
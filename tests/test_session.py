@@ -0,0 +1,102 @@
+import threading
+import time
+
+import kookpy
+from kookpy.session import ApiSession, RateLimiter
+
+
+def test_connections_are_reused_across_calls(fake_open_meteo):
+    session = kookpy.BaseWeatherAPI.get_session()
+
+    # different names so every call misses the response cache
+    for i in range(5):
+        assert kookpy.geocode_location(f"kook point {i}") is not None
+
+    stats = session.stats
+    assert stats['requests'] == 5
+    assert stats['new_connections'] == 1
+    assert stats['reused_connections'] == 4
+    assert stats['retries'] == 0
+
+
+def test_retries_on_5xx_then_succeeds(fake_open_meteo):
+    failures = {'left': 2}
+
+    def flaky_handler(path, query):
+        if failures['left'] > 0:
+            failures['left'] -= 1
+            return 503, {'error': True, 'reason': 'overloaded'}
+        return fake_open_meteo.default_handler(path, query)
+
+    fake_open_meteo.handlers['/v1/marine'] = flaky_handler
+
+    marine_df = kookpy.OpenMeteoMarineAPI(33.5, -117.8, "2023-01-01", "2023-01-02").fetch_data()
+
+    assert len(marine_df) == 48
+    assert fake_open_meteo.count('/v1/marine') == 3
+    assert kookpy.BaseWeatherAPI.get_session().stats['retries'] == 2
+
+
+def test_gives_up_after_max_retries(fake_open_meteo):
+    fake_open_meteo.handlers['/v1/marine'] = lambda path, query: (429, {'error': True})
+
+    marine_df = kookpy.OpenMeteoMarineAPI(33.5, -117.8, "2023-01-01", "2023-01-02").fetch_data()
+
+    session = kookpy.BaseWeatherAPI.get_session()
+    assert marine_df.empty
+    assert fake_open_meteo.count('/v1/marine') == session.max_retries + 1
+    assert session.stats['failures'] == 1
+
+
+def test_slow_upstream_times_out_instead_of_hanging(fake_open_meteo):
+    def hung_handler(path, query):
+        time.sleep(1.0)
+        return fake_open_meteo.default_handler(path, query)
+
+    fake_open_meteo.handlers['/v1/search'] = hung_handler
+    kookpy.BaseWeatherAPI.configure_session(
+        endpoint_timeouts={'geocoding': (0.5, 0.2)}, max_retries=1, backoff_factor=0.01)
+
+    start = time.perf_counter()
+    assert kookpy.geocode_location("kook point") is None
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0
+    stats = kookpy.BaseWeatherAPI.get_session().stats
+    assert stats['retries'] == 1
+    assert stats['failures'] == 1
+
+
+def test_timeouts_are_per_endpoint():
+    session = ApiSession(endpoint_timeouts={'marine': (1, 2)})
+
+    assert session.timeout_for('marine') == (1, 2)
+    assert session.timeout_for('archive')[1] > session.timeout_for('geocoding')[1]
+    assert session.timeout_for('unknown') == session.default_timeout
+
+
+def test_rate_limiter_caps_request_rate(fake_open_meteo):
+    session = kookpy.BaseWeatherAPI.configure_session(rate_limit=20)
+
+    started = time.perf_counter()
+    for i in range(30):
+        assert kookpy.geocode_location(f"kook point {i}") is not None
+    elapsed = time.perf_counter() - started
+
+    # a burst of 20 goes straight through, the other 10 wait for tokens at 20/s
+    assert elapsed >= 0.45
+    assert session.stats['requests'] == 30
+
+
+def test_rate_limiter_is_shared_across_threads():
+    limiter = RateLimiter(50, burst=1)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 20 acquisitions at 50/s with no burst take at least 19 intervals
+    assert time.perf_counter() - started >= 19 / 50 * 0.95
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from kookpy.tides import HIGH, LOW, find_tide_extrema, next_tides
+
+# semi-diurnal tide period in hours
+PERIOD = 12.42
+
+
+def test_extrema_are_interpolated_between_hourly_samples():
+    times = pd.date_range('2024-06-01', periods=72, freq='h')
+    levels = np.sin(2 * np.pi * np.arange(72) / PERIOD + 0.3)
+
+    events = find_tide_extrema(times, levels)
+
+    highs = events[events['kind'] == HIGH]
+    lows = events[events['kind'] == LOW]
+    assert len(highs) == 6 and len(lows) == 5
+    assert np.all(np.diff(events['time'].astype(np.int64)) > 0)
+    # true first high is at (pi/2 - 0.3) / 2pi * PERIOD hours, well off the hour
+    expected = pd.Timestamp('2024-06-01') + pd.Timedelta(hours=(np.pi / 2 - 0.3) / (2 * np.pi) * PERIOD)
+    assert abs(pd.Timestamp(highs['time'][0]) - expected) < pd.Timedelta(minutes=5)
+    assert np.allclose(highs['height'], 1.0, atol=0.01)
+    assert np.allclose(lows['height'], -1.0, atol=0.01)
+
+
+def test_missing_and_flat_samples():
+    times = pd.date_range('2024-06-01', periods=7, freq='h')
+
+    events = find_tide_extrema(times, [0.0, 1.0, 2.0, 2.0, 1.0, -999, 0.5])
+
+    # the plateau is one high in its middle, and the -999 gap is skipped without making a turn
+    assert list(events['kind']) == [HIGH]
+    assert pd.Timestamp(events['time'][0]) == times[0] + pd.Timedelta(hours=2.5)
+    assert len(find_tide_extrema(times[:2], [1.0, 2.0])) == 0
+    assert len(find_tide_extrema(times, [1.0] * 7)) == 0
+
+
+def test_next_tides_summary():
+    times = pd.date_range('2024-06-01', periods=48, freq='h')
+    events = find_tide_extrema(times, np.sin(2 * np.pi * np.arange(48) / PERIOD))
+
+    summary = next_tides(events, now=pd.Timestamp('2024-06-01 12:00').to_pydatetime())
+
+    assert set(summary) == {'next_high_tide', 'next_low_tide'}
+    assert summary['next_high_tide']['time'] == '15:31 PM'
+    assert next_tides(events, now=pd.Timestamp('2024-06-03').to_pydatetime()) is None